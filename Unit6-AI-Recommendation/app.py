@@ -3,16 +3,20 @@
 # ============================================================================
 
 import os
+import threading
 from dotenv import load_dotenv
 
 # Load environment variables BEFORE other imports
 load_dotenv()
 
-from flask import Flask
+from flask import Flask, Request
 from flask_migrate import Migrate
 from routes import register_routes
 from db_init import init_db
-from models import db, Movie, User, bcrypt
+from models import db, Movie, User, UserStats, bcrypt, include_object
+from trending import register_trending, start_trending_worker
+from importer import start_import_resumer
+from search import build_title_indexes_in_background
 from flask_login import LoginManager, login_user, current_user
 
 
@@ -22,12 +26,27 @@ from flask_login import LoginManager, login_user, current_user
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-please-change-in-production')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///cinematch.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///cinematch.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # Profile picture uploads (Lesson 5.6)
 app.config['UPLOAD_FOLDER'] = os.path.join(app.static_folder, 'uploads')
 app.config['MAX_CONTENT_LENGTH'] = 2 * 1024 * 1024  # 2 MB max upload size
+app.config['MAX_IMPORT_LENGTH'] = 512 * 1024 * 1024  # CSV imports are streamed
+app.config['IMPORT_BATCH_SIZE'] = 5000  # CSV rows per INSERT + COMMIT
+
+
+class CineMatchRequest(Request):
+    """Lets the CSV import endpoint accept uploads past the 2 MB limit"""
+
+    @property
+    def max_content_length(self):
+        if self.endpoint == 'import_csv':
+            return app.config['MAX_IMPORT_LENGTH']
+        return super().max_content_length
+
+
+app.request_class = CineMatchRequest
 
 # Create uploads folder if it doesn't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -37,7 +56,7 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 # ============================================================================
 
 db.init_app(app)
-migrate = Migrate(app, db)
+migrate = Migrate(app, db, include_object=include_object)
 
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -57,6 +76,43 @@ def load_user(user_id):
 # ============================================================================
 
 register_routes(app)
+register_trending(app)
+
+
+# ============================================================================
+# BACKGROUND WORK
+# ============================================================================
+# Started by the first request each process serves, so it runs under
+# `python app.py`, `flask run` and WSGI servers alike, but never for CLI
+# commands such as `flask db upgrade` (which serve no requests). The debug
+# reloader's watcher process serves nothing either.
+
+_background_started = False
+_background_lock = threading.Lock()
+
+
+@app.before_request
+def start_background_work():
+    """Start the trending refresher, build the title index and start
+    resuming interrupted imports, once"""
+    global _background_started
+    if _background_started:
+        return
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+    start_trending_worker(app)
+    build_title_indexes_in_background(app)
+    start_import_resumer(app)
+
+
+@app.cli.command('repair-user-stats')
+def repair_user_stats():
+    """Recompute every user's dashboard totals from favorites / watchlist"""
+    users = UserStats.rebuild()
+    db.session.commit()
+    print(f"✓ Rebuilt stats for {users} user(s)")
 
 
 # ============================================================================
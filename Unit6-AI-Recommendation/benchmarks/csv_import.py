@@ -0,0 +1,131 @@
+# ============================================================================
+# benchmarks/csv_import.py - rows/sec of the CSV import paths
+# ============================================================================
+#
+# Generates a synthetic CSV and imports it into a fresh SQLite database
+# (created from the models, FTS / trigram triggers included) two ways:
+#
+#   ORM:  one Movie object per row, db.session.add(), one commit at the end
+#         (how import_csv used to work)
+#   Core: importer.import_movies() - INSERT executemany, commit per batch
+#
+# and then times a second, unchanged import of the same file in "upsert"
+# mode (a nightly refresh where nothing changed).
+#
+# It also times column extraction alone (no database): csv.DictReader with
+# get_csv_value() probing every candidate column name on each row, against
+# csv.reader with the header compiled once by compile_csv_extractor().
+#
+# Run from the Unit6-AI-Recommendation folder:
+#     python benchmarks/csv_import.py              (100,000 rows)
+#     python benchmarks/csv_import.py 500000 5000  (rows, batch size)
+
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from models import db, Movie
+from importer import CSV_COLUMNS, import_movies, movie_row_reader
+from utilities import compile_csv_extractor, get_csv_value
+
+GENRES = ["Action", "Comedy", "Crime", "Drama", "Horror", "Romance",
+          "Sci-Fi", "Thriller", "Animation", "Documentary"]
+
+
+def make_csv(count):
+    random.seed(42)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["Series_Title", "Released_Year", "Genre", "Director",
+                     "IMDB_Rating", "Overview"])
+    for i in range(count):
+        writer.writerow([f"Movie {i}", random.randint(1920, 2025), random.choice(GENRES),
+                         f"Director {i % 5000}", round(random.uniform(1.0, 9.9), 1),
+                         "A synthetic plot summary for the import benchmark."])
+    return out.getvalue()
+
+
+def orm_import(stream):
+    """The old path: an ORM object per row and a single commit."""
+    imported = 0
+    reader = csv.reader(stream)
+    movie_values = movie_row_reader(next(reader))
+    for row in reader:
+        values = movie_values(row)
+        if values:
+            db.session.add(Movie(**values))
+            imported += 1
+    db.session.commit()
+    return imported
+
+
+def parse_dict_rows(stream):
+    """The old per-row lookup: DictReader + get_csv_value for every column."""
+    parsed = 0
+    for row in csv.DictReader(stream):
+        values = []
+        for _, names, parse in CSV_COLUMNS:
+            value = get_csv_value(row, *names)
+            values.append(parse(value) if parse else value)
+        parsed += values[0] is not None
+    return parsed
+
+
+def parse_compiled_rows(stream):
+    reader = csv.reader(stream)
+    extract = compile_csv_extractor(
+        next(reader), [(names, parse) for _, names, parse in CSV_COLUMNS]
+    )
+    return sum(extract(row)[0] is not None for row in reader)
+
+
+def time_parse(label, data, parse):
+    start = time.perf_counter()
+    parsed = parse(io.StringIO(data))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {parsed:>9,} rows  {elapsed:7.2f} s  "
+          f"{parsed / elapsed:>9,.0f} rows/s")
+
+
+def run(label, data, do_import, setup=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp}/bench.db"
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            if setup:
+                setup(io.StringIO(data))
+            start = time.perf_counter()
+            imported = do_import(io.StringIO(data))
+            elapsed = time.perf_counter() - start
+            db.session.remove()
+            db.engine.dispose()
+    print(f"{label:<40} {imported:>9,} rows  {elapsed:7.2f} s  "
+          f"{imported / elapsed:>9,.0f} rows/s")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    data = make_csv(count)
+
+    time_parse("Parse: DictReader + get_csv_value", data, parse_dict_rows)
+    time_parse("Parse: compiled header", data, parse_compiled_rows)
+    run("ORM add() + one commit", data, orm_import)
+    run(f"Core executemany, commit every {batch_size:,}", data,
+        lambda stream: import_movies(stream, batch_size=batch_size).imported)
+    run("Upsert re-import, nothing changed", data,
+        lambda stream: import_movies(stream, batch_size=batch_size, mode="upsert").unchanged,
+        setup=lambda stream: import_movies(stream, batch_size=batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# ============================================================================
+# benchmarks/fuzzy_search.py - misspelled title lookups on a crowded catalog
+# ============================================================================
+#
+# Builds a throwaway SQLite catalog (FTS / trigram triggers included) of
+# titles made from a few common words, so trigrams like "god", "fat" and
+# "the" appear in tens of thousands of titles, then adds "The Godfather".
+# Each misspelling must still rank it first; the script stops with an
+# AssertionError if it does not, and prints the time per lookup.
+#
+# Run from the Unit6-AI-Recommendation folder:
+#     python benchmarks/fuzzy_search.py            (200,000 movies)
+#     python benchmarks/fuzzy_search.py 500000
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from models import db, Movie, normalize_title
+from search import fuzzy_title_search
+
+WORDS = ["god", "father", "fathom", "the", "dark", "star", "night", "love",
+         "man", "king", "war", "return", "of", "a", "fate", "other", "gold"]
+
+QUERIES = ["godfater", "the godfater", "Godfathr", "teh godfather"]
+
+
+def build_catalog(count):
+    random.seed(42)
+    rows = []
+    for i in range(count):
+        title = " ".join(random.choice(WORDS).title()
+                         for _ in range(random.randint(1, 3))) + f" {i}"
+        rows.append({"title": title, "title_key": normalize_title(title),
+                     "year": random.randint(1920, 2025),
+                     "rating": round(random.uniform(1.0, 9.9), 1)})
+    db.session.execute(Movie.__table__.insert(), rows)
+    godfather = Movie(title="The Godfather", year=1972, rating=9.2)
+    db.session.add(godfather)
+    db.session.commit()
+    return godfather.id
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp}/bench.db"
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            print(f"Building synthetic catalog of {count:,} movies...")
+            target = build_catalog(count)
+
+            for query in QUERIES:
+                start = time.perf_counter()
+                for _ in range(5):
+                    ids = fuzzy_title_search(query)
+                elapsed_ms = (time.perf_counter() - start) / 5 * 1000
+                rank = ids.index(target) + 1 if target in ids else None
+                print(f"{query!r:<18} The Godfather at #{rank}  ({elapsed_ms:.1f} ms/query)")
+                assert rank == 1, f"{query!r} did not rank The Godfather first"
+
+            db.session.remove()
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
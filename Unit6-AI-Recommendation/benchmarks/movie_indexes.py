@@ -0,0 +1,132 @@
+# ============================================================================
+# benchmarks/movie_indexes.py - EXPLAIN QUERY PLAN for the /movies queries
+# ============================================================================
+#
+# Builds a synthetic catalog in a throwaway SQLite database, then runs the
+# query shapes used by movies_list() twice: once on the bare table and once
+# after creating the indexes declared on Movie in models.py.
+#
+# Not every shape becomes an index SEARCH. For genre IN (...) SQLite walks
+# ix_movie_rating_id in ORDER BY order and filters each row, which is only
+# fast because LIMIT stops the walk once a page is found. With rare genres
+# ("several rare genres") it reads most of the index before it fills a page,
+# so movies_list() sends the "per-genre seeks" shape from
+# catalog.genre_seek() instead. A year range does SEARCH
+# ix_movie_year_rating, but then has to sort what it finds.
+#
+# Run from the Unit6-AI-Recommendation folder:
+#     python benchmarks/movie_indexes.py            (200,000 movies)
+#     python benchmarks/movie_indexes.py 1000000
+
+import os
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
+from models import Movie
+
+GENRES = ["Action", "Comedy", "Crime", "Drama", "Horror", "Romance",
+          "Sci-Fi", "Thriller", "Animation", "Documentary"]
+RARE_GENRES = ["Western", "Musical", "Noir"]  # together one movie in 10,000
+
+# (label, SQL, parameters) - same shapes movies_list() sends to SQLite
+QUERIES = [
+    ("browse, page 1",
+     "SELECT * FROM movie ORDER BY rating DESC, id DESC LIMIT 8", ()),
+    ("filter by genre",
+     "SELECT * FROM movie WHERE genre = ? ORDER BY rating DESC, id DESC LIMIT 8",
+     ("Drama",)),
+    ("filter by year",
+     "SELECT * FROM movie WHERE year = ? ORDER BY rating DESC, id DESC LIMIT 8",
+     (1994,)),
+    ("several genres",
+     "SELECT * FROM movie WHERE genre IN (?, ?, ?) "
+     "ORDER BY rating DESC, id DESC LIMIT 8", ("Drama", "Crime", "Horror")),
+    ("several rare genres",
+     "SELECT * FROM movie WHERE genre IN (?, ?, ?) "
+     "ORDER BY rating DESC, id DESC LIMIT 8", tuple(RARE_GENRES)),
+    ("several rare genres, per-genre seeks",
+     "SELECT * FROM movie WHERE id IN ("
+     + " UNION ALL ".join(["SELECT id FROM (SELECT id FROM movie WHERE genre = ? "
+                           "ORDER BY rating DESC, id DESC LIMIT 8)"] * 3)
+     + ") ORDER BY rating DESC, id DESC LIMIT 8", tuple(RARE_GENRES)),
+    ("year range",
+     "SELECT * FROM movie WHERE year BETWEEN ? AND ? "
+     "ORDER BY rating DESC, id DESC LIMIT 8", (1990, 1999)),
+    ("rating range",
+     "SELECT * FROM movie WHERE rating BETWEEN ? AND ? "
+     "ORDER BY rating DESC, id DESC LIMIT 8", (7.0, 8.0)),
+    ("min rating",
+     "SELECT * FROM movie WHERE rating >= ? ORDER BY rating DESC, id DESC LIMIT 8",
+     (8.5,)),
+    ("keyset seek",
+     "SELECT * FROM movie WHERE (rating, id) < (?, ?) "
+     "ORDER BY rating DESC, id DESC LIMIT 9", (6.0, 50000)),
+    ("count by genre",
+     "SELECT count(*) FROM movie WHERE genre = ?", ("Drama",)),
+]
+
+
+def build_catalog(conn, count):
+    """Create the movie table from the model and fill it with fake rows."""
+    dialect = sqlite.dialect()
+    conn.execute(str(CreateTable(Movie.__table__).compile(dialect=dialect)))
+
+    random.seed(42)
+    rows = (
+        (f"Movie {i}", random.randint(1920, 2025),
+         RARE_GENRES[i // 10_000 % 3] if i % 10_000 == 0 else random.choice(GENRES),
+         f"Director {i % 5000}", round(random.uniform(1.0, 9.9), 1),
+         "A synthetic plot summary.", None, None,
+         f"2026-01-01 00:00:{i % 60:02d}")
+        for i in range(count)
+    )
+    conn.executemany(
+        "INSERT INTO movie (title, year, genre, director, rating, description,"
+        " poster_url, tmdb_id, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+
+
+def create_indexes(conn):
+    dialect = sqlite.dialect()
+    for index in sorted(Movie.__table__.indexes, key=lambda ix: ix.name):
+        conn.execute(str(CreateIndex(index).compile(dialect=dialect)))
+    conn.execute("ANALYZE")
+    conn.commit()
+
+
+def run_queries(conn, title):
+    print(f"\n=== {title} ===")
+    for label, sql, params in QUERIES:
+        plan = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+        start = time.perf_counter()
+        for _ in range(20):
+            conn.execute(sql, params).fetchall()
+        elapsed_ms = (time.perf_counter() - start) / 20 * 1000
+
+        print(f"\n{label}  ({elapsed_ms:.2f} ms/query)")
+        for row in plan:
+            print(f"    {row[-1]}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    conn = sqlite3.connect(":memory:")
+
+    print(f"Building synthetic catalog of {count:,} movies...")
+    build_catalog(conn, count)
+
+    run_queries(conn, "BEFORE: no indexes")
+    create_indexes(conn)
+    run_queries(conn, "AFTER: indexes from models.Movie")
+
+
+if __name__ == "__main__":
+    main()
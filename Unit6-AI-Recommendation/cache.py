@@ -0,0 +1,254 @@
+# ============================================================================
+# cache.py - CineMatch In-Process Caches
+# ============================================================================
+#
+# The catalog only changes when an admin adds, edits, deletes or imports
+# movies. Every one of those write paths calls bump_catalog_version(), and
+# every cache here is tagged with the version it was built from: a cached
+# value is simply ignored once the version has moved on.
+#
+# The caches live in this Python process, but the version lives in the
+# catalog_state row, read once per request. With several worker processes
+# each one keeps its own copy, and a write made through any of them makes
+# every worker's copy stale.
+
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+from flask import current_app, g, make_response, request, session
+from flask_login import current_user
+from werkzeug.http import is_resource_modified
+from sqlalchemy.dialects.sqlite import insert
+from models import db, CatalogState, Movie
+
+
+# ============================================================================
+# CATALOG VERSION
+# ============================================================================
+
+# Fallback if the catalog_state row was never seeded (migration / db_init)
+_started_at = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def _catalog_state():
+    """(version, modified_at), read from catalog_state once per app context."""
+    if "catalog_state" not in g:
+        row = db.session.execute(
+            db.select(CatalogState.version, CatalogState.modified_at)
+            .where(CatalogState.id == 1)
+        ).first()
+        if row is None:
+            g.catalog_state = (0, _started_at)
+        else:
+            modified = row.modified_at or _started_at
+            g.catalog_state = (row.version, modified.replace(tzinfo=timezone.utc))
+    return g.catalog_state
+
+
+def catalog_version():
+    """Current catalog version; changes after every write to Movie."""
+    return _catalog_state()[0]
+
+
+def catalog_modified_at():
+    """Last-Modified time for pages built from the whole catalog."""
+    return _catalog_state()[1]
+
+
+def bump_catalog_version():
+    """Mark every cached catalog value as stale. Call after committing."""
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    # One upsert, so concurrent writers in other workers can't lose a bump
+    stmt = insert(CatalogState).values(id=1, version=1, modified_at=now)
+    version = db.session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[CatalogState.id],
+            set_={"version": CatalogState.version + 1, "modified_at": now},
+        ).returning(CatalogState.version)
+    ).scalar_one()
+    db.session.commit()
+    g.catalog_state = (version, now)
+    # Stale pages can never be served again; free their memory right away
+    _page_cache.clear()
+    return version
+
+
+# ============================================================================
+# LRU CACHE
+# ============================================================================
+
+class LRUCache:
+    """Small thread-safe dict that forgets its least recently used entries.
+
+    Bounded by entry count, and optionally by total weight (e.g. bytes)
+    when a `weigh(value)` function is given.
+    """
+
+    def __init__(self, maxsize=256, max_weight=None, weigh=None):
+        self.maxsize = maxsize
+        self.max_weight = max_weight
+        self.weigh = weigh
+        self.weight = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            if key in self._data:
+                self._forget(key)
+            self._data[key] = value
+            if self.weigh:
+                self.weight += self.weigh(value)
+            while self._data and (
+                len(self._data) > self.maxsize
+                or (self.max_weight and self.weight > self.max_weight)
+            ):
+                self._forget(next(iter(self._data)))
+
+    def _forget(self, key):
+        value = self._data.pop(key)
+        if self.weigh:
+            self.weight -= self.weigh(value)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.weight = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+# ============================================================================
+# GENRE FACET CACHE
+# ============================================================================
+
+_genre_cache = (None, [])  # (catalog version, sorted genre names)
+
+
+def get_genres():
+    """Sorted list of distinct genres, re-queried only after a catalog write."""
+    global _genre_cache
+    version = catalog_version()
+    cached_version, genres = _genre_cache
+    if cached_version == version:
+        return genres
+
+    rows = db.session.query(Movie.genre).distinct().order_by(Movie.genre).all()
+    genres = [g[0] for g in rows if g[0]]
+    _genre_cache = (version, genres)
+    return genres
+
+
+# ============================================================================
+# PAGE CACHE (anonymous visitors)
+# ============================================================================
+# Catalog pages look the same for every anonymous visitor until an admin
+# changes a movie, so their rendered HTML is kept and replayed. Logged-in
+# users see per-user bits (navbar, favorite buttons, admin tools) and
+# always get a fresh render, as does anyone with a flash message waiting.
+
+PAGE_CACHE_ENTRIES = 1024
+PAGE_CACHE_BYTES = 32 * 1024 * 1024
+
+_page_cache = LRUCache(
+    maxsize=PAGE_CACHE_ENTRIES,
+    max_weight=PAGE_CACHE_BYTES,
+    weigh=lambda page: len(page[0]),
+)
+
+
+def _sorted_args(args):
+    """Query string arguments in a stable order, without empty values."""
+    return tuple(sorted((k, v) for k, v in args.items(multi=True) if v != ""))
+
+
+def _is_shared_page_request():
+    """True when the page would look the same for every anonymous visitor."""
+    return (request.method == "GET"
+            and not current_user.is_authenticated
+            and not session.get("_flashes"))
+
+
+def cached_page(normalize_args=_sorted_args):
+    """Decorator: serve a view's HTML from the page cache for anonymous users.
+
+    `normalize_args(request.args)` must return a hashable value that is the
+    same for every URL showing the same page.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not _is_shared_page_request():
+                return view(*args, **kwargs)
+
+            key = (catalog_version(), request.path, normalize_args(request.args))
+            page = _page_cache.get(key)
+            if page is not None:
+                body, mimetype = page
+                response = current_app.response_class(body, mimetype=mimetype)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.direct_passthrough:
+                    _page_cache.set(key, (response.get_data(), response.mimetype))
+
+            response.vary.add("Cookie")
+            return response
+        return wrapper
+    return decorator
+
+
+# ============================================================================
+# CONDITIONAL GET (ETag / Last-Modified)
+# ============================================================================
+# Browsers and the CDN revalidate with If-None-Match / If-Modified-Since.
+# The validators are computed from the catalog version (and, for a single
+# movie, its updated_at) *before* the view runs, so an unchanged page is
+# answered with an empty 304 without touching any template.
+
+def conditional_page(normalize_args=_sorted_args, last_modified=None):
+    """Decorator: answer revalidation requests with 304 Not Modified.
+
+    `last_modified(**view_args)` returns the datetime the page's content last
+    changed (default: the last catalog write), or None to skip the check,
+    e.g. for a movie that does not exist. Only anonymous pages are
+    validated, like the page cache.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not _is_shared_page_request():
+                return view(*args, **kwargs)
+
+            modified = last_modified(**kwargs) if last_modified else catalog_modified_at()
+            if modified is None:
+                return view(*args, **kwargs)
+
+            tag = hashlib.sha1(repr((
+                catalog_version(), request.path,
+                normalize_args(request.args), modified.isoformat(),
+            )).encode()).hexdigest()
+
+            if not is_resource_modified(request.environ, etag=tag, last_modified=modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(tag)
+            response.last_modified = modified
+            response.cache_control.no_cache = True
+            response.vary.add("Cookie")
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,486 @@
+# ============================================================================
+# catalog.py - CineMatch Catalog Browsing Helpers
+# ============================================================================
+
+import base64
+import json
+import math
+from collections import Counter
+from dataclasses import dataclass, replace
+from datetime import datetime
+from flask import g
+from flask_login import current_user
+from flask_sqlalchemy.pagination import QueryPagination
+from sqlalchemy import Integer, and_, cast, func, select, tuple_, union_all
+from models import db, Movie
+from search import build_match_query, fts_search_subquery
+from cache import LRUCache, catalog_modified_at, catalog_version
+
+
+# ============================================================================
+# BROWSE FILTERS
+# ============================================================================
+
+# Integers from the query string are clamped to these before they reach
+# SQLite, which cannot bind anything past 64 bits (OverflowError, a 500)
+YEAR_RANGE = (1, 9999)
+MAX_PAGE = 100_000
+
+
+def _clamp(value, low, high):
+    return None if value is None else max(low, min(value, high))
+
+
+def page_arg(args, name="page"):
+    """A ?page= style argument as a page number from 1 to MAX_PAGE."""
+    return _clamp(args.get(name, 1, type=int), 1, MAX_PAGE)
+
+
+@dataclass(frozen=True)
+class MovieFilters:
+    """The filters a visitor picked on /movies, parsed from the query string.
+
+    Multi-value and range filters, e.g.
+        ?genre=Drama&genre=Crime&year_min=1990&year_max=1999&rating_min=8
+
+    Values are normalized (genres sorted and de-duplicated, years clamped
+    to YEAR_RANGE, ranges put in order), so equivalent URLs give equal - and equally hashed - filters and
+    share cache entries. The old single-value ?year= and ?min_rating= still
+    work.
+    """
+    query: str = ""
+    genres: tuple = ()
+    year_min: int = None
+    year_max: int = None
+    rating_min: float = None
+    rating_max: float = None
+
+    @classmethod
+    def from_args(cls, args):
+        genres = tuple(sorted({g.strip() for g in args.getlist("genre") if g.strip()}))
+
+        year = args.get("year", type=int)
+        year_min = _clamp(args.get("year_min", year, type=int), *YEAR_RANGE)
+        year_max = _clamp(args.get("year_max", year, type=int), *YEAR_RANGE)
+        if year_min is not None and year_max is not None and year_min > year_max:
+            year_min, year_max = year_max, year_min
+
+        rating_min = args.get("rating_min", args.get("min_rating", type=float), type=float)
+        rating_max = args.get("rating_max", type=float)
+        if rating_min is not None and rating_max is not None and rating_min > rating_max:
+            rating_min, rating_max = rating_max, rating_min
+
+        return cls(
+            query=" ".join(args.get("query", "").split()),
+            genres=genres,
+            year_min=year_min,
+            year_max=year_max,
+            rating_min=rating_min,
+            rating_max=rating_max,
+        )
+
+    def to_args(self, **overrides):
+        """Canonical query-string arguments for url_for(), minus empty values."""
+        args = {
+            "query": self.query,
+            "genre": list(self.genres),
+            "year_min": self.year_min,
+            "year_max": self.year_max,
+            "rating_min": self.rating_min,
+            "rating_max": self.rating_max,
+        }
+        args.update(overrides)
+        return {key: value for key, value in args.items()
+                if value not in (None, "", [])}
+
+    def toggle_genre(self, genre):
+        """The same filters with `genre` added to or removed from the set."""
+        genres = set(self.genres) ^ {genre}
+        return replace(self, genres=tuple(sorted(genres)))
+
+    def search_hits(self):
+        """FTS5 subquery of (movie_id, rank) for the text search, if any."""
+        match = build_match_query(self.query) if self.query else None
+        return fts_search_subquery(match) if match else None
+
+    def apply(self, query, hits=None):
+        """Add the WHERE clauses (and FTS join) for these filters to a query.
+
+        Single values compile to "=", sets to "IN" and ranges to "BETWEEN",
+        which the (genre, rating) / (year, rating) / (rating, id) indexes
+        can all serve - except a page over several genres, which needs
+        genre_seek() to stay on the index. Pass in `hits` from
+        search_hits() when the caller also wants to order by its bm25 rank.
+        """
+        if self.query:
+            if hits is None:
+                hits = self.search_hits()
+            if hits is not None:
+                query = query.join(hits, hits.c.movie_id == Movie.id)
+            else:
+                query = query.filter(Movie.title.ilike(f"%{self.query}%"))
+
+        if len(self.genres) == 1:
+            query = query.filter(Movie.genre == self.genres[0])
+        elif self.genres:
+            query = query.filter(Movie.genre.in_(self.genres))
+
+        query = _filter_range(query, Movie.year, self.year_min, self.year_max)
+        query = _filter_range(query, Movie.rating, self.rating_min, self.rating_max)
+        return query
+
+
+def browse_cache_key(args):
+    """Page-cache key for /movies: normalized filters plus the paging args."""
+    return (
+        MovieFilters.from_args(args),
+        page_arg(args),
+        args.get("after"),
+        args.get("before"),
+        args.get("paging") == "cursor",
+    )
+
+
+def movie_last_modified(id):
+    """When a movie's page last changed, or None if there is no such movie."""
+    row = (
+        db.session.query(Movie.updated_at, Movie.created_at)
+        .filter(Movie.id == id)
+        .first()
+    )
+    if row is None:
+        return None
+    return (row.updated_at or row.created_at or catalog_modified_at()).replace(microsecond=0)
+
+
+def _filter_range(query, column, low, high):
+    if low is not None and high is not None:
+        if low == high:
+            return query.filter(column == low)
+        return query.filter(column.between(low, high))
+    if low is not None:
+        return query.filter(column >= low)
+    if high is not None:
+        return query.filter(column <= high)
+    return query
+
+
+# ============================================================================
+# PER-USER CARD BADGES
+# ============================================================================
+
+class UserMovieFlags:
+    """Which of the movies on a page the current user has favorited or
+    put on their watchlist. Empty for anonymous visitors."""
+
+    def __init__(self, favorites=(), watchlist=()):
+        self.favorites = frozenset(favorites)
+        self.watchlist = frozenset(watchlist)
+
+    def is_favorite(self, movie):
+        return movie.id in self.favorites
+
+    def in_watchlist(self, movie):
+        return movie.id in self.watchlist
+
+
+def user_movie_flags(movies):
+    """Favorite / watchlist flags for a page of movies, loaded in one batch.
+
+    Remembered for the rest of the request, so asking again for movies
+    already looked up costs no queries.
+    """
+    if not current_user.is_authenticated:
+        return UserMovieFlags()
+
+    flags = g.setdefault("user_movie_flags", UserMovieFlags())
+    missing = {movie.id for movie in movies} - g.setdefault("user_movie_flags_ids", set())
+    if missing:
+        favorites, watchlist = current_user.movie_flags(missing)
+        flags = UserMovieFlags(flags.favorites | favorites, flags.watchlist | watchlist)
+        g.user_movie_flags = flags
+        g.user_movie_flags_ids |= missing
+    return flags
+
+
+# ============================================================================
+# KEYSET (CURSOR) PAGINATION
+# ============================================================================
+# OFFSET pagination makes SQLite walk past every skipped row, and paginate()
+# adds a COUNT(*) on top. Keyset pagination remembers the (rating, id) of the
+# last card on the page and seeks straight to the next one, so page 5,000
+# costs the same as page 1.
+#
+# Sort order is rating DESC, id DESC. SQLite sorts NULL below every value,
+# so unrated movies come last and need their own branch in the predicates.
+
+def encode_cursor(movie):
+    """Build an opaque URL-safe token from a movie's sort key."""
+    raw = json.dumps([movie.rating, movie.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Turn a cursor token back into (rating, id), or None if it is invalid.
+
+    Tokens come from the URL, so a well-formed one can still hold an id
+    SQLite cannot bind or a rating such as Infinity; those are invalid too.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        rating, movie_id = json.loads(base64.urlsafe_b64decode(padded))
+        rating = None if rating is None else float(rating)
+        movie_id = int(movie_id)
+    except (ValueError, TypeError, OverflowError):
+        return None
+    if not -2**63 <= movie_id < 2**63 or (rating is not None and not math.isfinite(rating)):
+        return None
+    return rating, movie_id
+
+
+DESC_ORDER = (Movie.rating.desc(), Movie.id.desc())
+ASC_ORDER = (Movie.rating.asc(), Movie.id.asc())
+
+
+def _segments_after(key):
+    """(filter, order) ranges holding the rows after a cursor, in page order.
+
+    Each range is a single index seek on (rating, id). The unrated tail is a
+    separate range so the common case never has to OR in "rating IS NULL",
+    which would turn the seek back into a scan.
+    """
+    if key is None:
+        return [(None, DESC_ORDER)]
+    rating, movie_id = key
+    if rating is None:
+        return [(and_(Movie.rating.is_(None), Movie.id < movie_id), DESC_ORDER)]
+    return [
+        (tuple_(Movie.rating, Movie.id) < (rating, movie_id), DESC_ORDER),
+        (Movie.rating.is_(None), DESC_ORDER),
+    ]
+
+
+def _segments_before(key):
+    """(filter, order) ranges holding the rows before a cursor, nearest first."""
+    rating, movie_id = key
+    if rating is None:
+        return [
+            (and_(Movie.rating.is_(None), Movie.id > movie_id), ASC_ORDER),
+            (Movie.rating.isnot(None), ASC_ORDER),
+        ]
+    return [(tuple_(Movie.rating, Movie.id) > (rating, movie_id), ASC_ORDER)]
+
+
+def _fetch(query, segments, limit, genres=()):
+    """Read up to `limit` rows, moving on to the next range only if needed."""
+    rows = []
+    for condition, order in segments:
+        q = query if condition is None else query.filter(condition)
+        rows += genre_seek(q, genres, order, limit - len(rows))
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+class KeysetPage:
+    """One page of movies fetched by seeking on (rating DESC, id DESC).
+
+    Exposes the same has_prev / has_next / items names as a Flask-SQLAlchemy
+    Pagination, plus the tokens for the neighbouring pages. There is no
+    total: not counting the whole result set is the point.
+
+    Pass the filter's `genres` to read multi-genre pages with genre_seek().
+    """
+
+    def __init__(self, query, per_page, after=None, before=None, genres=()):
+        self.per_page = per_page
+        after_key = decode_cursor(after) if after else None
+        before_key = decode_cursor(before) if before else None
+
+        if before_key:
+            # Walk backwards from the cursor, then flip the rows back around
+            rows = _fetch(query, _segments_before(before_key), per_page + 1, genres)
+            self.has_prev = len(rows) > per_page
+            self.has_next = True
+            self.items = rows[:per_page][::-1]
+        else:
+            rows = _fetch(query, _segments_after(after_key), per_page + 1, genres)
+            self.has_prev = after_key is not None
+            self.has_next = len(rows) > per_page
+            self.items = rows[:per_page]
+
+        if not self.items:
+            self.has_prev = self.has_next = False
+
+    @property
+    def next_cursor(self):
+        return encode_cursor(self.items[-1]) if self.has_next else None
+
+    @property
+    def prev_cursor(self):
+        return encode_cursor(self.items[0]) if self.has_prev else None
+
+
+def keyset_chunks(query, chunk_size, genres=()):
+    """Every row of `query` in page order, read as successive KeysetPages.
+
+    Each chunk is fetched in full and its read transaction ended before the
+    rows are handed out, so a slow consumer (a streamed export) never keeps
+    a SQLite cursor - and the shared lock that blocks every writer - open.
+    """
+    after = None
+    while True:
+        page = KeysetPage(query, chunk_size, after=after, genres=genres)
+        db.session.rollback()
+        yield from page.items
+        if not page.has_next:
+            return
+        after = page.next_cursor
+
+
+# ============================================================================
+# MULTI-GENRE PAGES
+# ============================================================================
+# ix_movie_genre_rating is only in (rating, id) order within one genre, so
+# for genre IN (...) SQLite walks ix_movie_rating_id instead and filters
+# every row - for rare genres that reads most of the index before a page
+# fills. genre_seek() asks each genre for its own first offset + limit rows
+# (one index seek each, already in page order) and only merges those.
+
+def genre_seek(query, genres, order, limit, offset=0):
+    """query.order_by(*order).offset(offset).limit(limit).all(), one seek per genre."""
+    if len(genres) < 2:
+        return query.order_by(*order).offset(offset).limit(limit).all()
+    seeks = []
+    for genre in genres:
+        seek = (query.filter(Movie.genre == genre).with_entities(Movie.id)
+                .order_by(*order).limit(offset + limit).subquery())
+        seeks.append(select(seek.c.id))
+    return (query.filter(Movie.id.in_(union_all(*seeks)))
+            .order_by(*order).offset(offset).limit(limit).all())
+
+
+class GenreSeekPagination(QueryPagination):
+    """Numbered pages whose items are read with genre_seek()."""
+
+    def _query_items(self):
+        args = self._query_args
+        return genre_seek(args["query"], args["genres"], args["order"],
+                          self.per_page, self._query_offset)
+
+
+def paginate_movies(query, order, page, per_page, genres=()):
+    """query.order_by(*order).paginate(), seeking per genre for several genres."""
+    if len(genres) < 2:
+        return query.order_by(*order).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+    return GenreSeekPagination(query=query, genres=genres, order=order,
+                               page=page, per_page=per_page, error_out=False)
+
+
+# ============================================================================
+# FACET COUNTS
+# ============================================================================
+# The browse sidebar shows how many movies match each genre, decade and
+# rating bucket *within the current filters*. Rather than one COUNT query
+# per facet, a single GROUP BY (genre, decade, rating bucket) returns a
+# few hundred rows at most, and Python rolls them up into each facet.
+#
+# The genre filter is left out of that query and applied during the roll-up
+# instead: decade and rating counts honour it, while the genre list keeps
+# showing the other genres (with counts) so they can be added to the set.
+
+_facet_cache = LRUCache(maxsize=512)
+
+
+class Facets:
+    """Bucket counts for the current filter set.
+
+    genres:  [(genre, count)] most common first
+    decades: [(decade, count)] newest first, e.g. (1990, 3311)
+    ratings: [(floor, count)] where count is movies rated >= floor, 9+ first
+    """
+
+    def __init__(self, rows, selected_genres=()):
+        genres, decades, buckets = Counter(), Counter(), Counter()
+        for genre, decade, bucket, count in rows:
+            if genre:
+                genres[genre] += count
+            if selected_genres and genre not in selected_genres:
+                continue
+            if decade is not None:
+                decades[decade] += count
+            if bucket is not None:
+                buckets[min(bucket, 9)] += count
+
+        self.genres = sorted(genres.items(), key=lambda item: (-item[1], item[0]))
+        self.decades = sorted(decades.items(), reverse=True)
+
+        # Cumulative "N+" buckets, skipping floors that add no movies
+        self.ratings = []
+        at_least = 0
+        for floor in range(9, 0, -1):
+            if buckets[floor]:
+                at_least += buckets[floor]
+                self.ratings.append((floor, at_least))
+
+
+def get_facets(filters):
+    """Facet counts for a MovieFilters, cached per filter set and catalog version."""
+    key = (catalog_version(), filters)
+    facets = _facet_cache.get(key)
+    if facets is None:
+        decade = (Movie.year // 10 * 10).label("decade")
+        bucket = cast(Movie.rating, Integer).label("bucket")
+        q = db.session.query(Movie.genre, decade, bucket, func.count())
+        q = replace(filters, genres=()).apply(q)
+        q = q.group_by(Movie.genre, decade, bucket)
+        facets = Facets(q.all(), selected_genres=filters.genres)
+        _facet_cache.set(key, facets)
+    return facets
+
+
+# ============================================================================
+# CATALOG API (JSON / NDJSON export)
+# ============================================================================
+# /api/movies selects only the columns a client asks for with ?fields=, so
+# an export that skips `description` never loads the plot text at all. Rows
+# are plain tuples rather than Movie objects: nothing is added to the
+# session's identity map, and memory stays flat however many rows stream.
+
+API_FIELDS = (
+    "id", "title", "year", "genre", "director", "rating",
+    "description", "poster_url", "tmdb_id", "created_at", "updated_at",
+)
+
+
+def parse_api_fields(value):
+    """Columns named in a comma-separated ?fields= value, in API_FIELDS order.
+
+    Raises:
+        ValueError: if a name is not one of API_FIELDS
+    """
+    if not value:
+        return API_FIELDS
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = names.difference(API_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    return tuple(name for name in API_FIELDS if name in names)
+
+
+def api_movie_query(filters, fields):
+    """Query over just the requested columns, plus the (rating, id) sort key."""
+    names = dict.fromkeys(("id", "rating") + tuple(fields))
+    columns = [getattr(Movie, name) for name in names]
+    return filters.apply(db.session.query(*columns))
+
+
+def api_movie_dict(row, fields):
+    """JSON-ready dict of the requested fields of one api_movie_query() row."""
+    movie = {}
+    for name in fields:
+        value = getattr(row, name)
+        movie[name] = value.isoformat() if isinstance(value, datetime) else value
+    return movie
@@ -2,7 +2,9 @@
 # db_init.py - Database Initialization
 # ============================================================================
 
-from models import db, Movie
+from datetime import datetime, timezone
+from sqlalchemy.dialects.sqlite import insert
+from models import db, CatalogState, Movie
 
 
 def init_db(app):
@@ -11,6 +13,16 @@ def init_db(app):
         db.create_all()
         print("✓ Database tables created/verified")
 
+        # One shared catalog version, so every worker sends the same
+        # Last-Modified / ETag before the first catalog write
+        db.session.execute(
+            insert(CatalogState)
+            .values(id=1, version=0,
+                    modified_at=datetime.now(timezone.utc).replace(microsecond=0))
+            .on_conflict_do_nothing(index_elements=[CatalogState.id])
+        )
+        db.session.commit()
+
         if Movie.query.count() == 0:
             print("🎬 Loading initial sample movies...")
 
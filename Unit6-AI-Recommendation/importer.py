@@ -0,0 +1,447 @@
+# ============================================================================
+# importer.py - CineMatch CSV Movie Import
+# ============================================================================
+#
+# The upload is read as a stream: the raw bytes are decoded incrementally
+# by a TextIOWrapper, csv.reader pulls one line at a time from it, and the
+# movies are written in fixed-size batches. Only one batch is ever held in
+# memory, so a 5M-row file costs the same RAM as a 1k-row one.
+#
+# The header is resolved once per file (utilities.compile_csv_extractor):
+# each movie column is mapped to its position in the row, so rows stay
+# plain lists instead of DictReader dicts probed for every candidate name.
+#
+# Each batch is a single Core INSERT executemany (no ORM objects, no unit of
+# work) followed by a commit, so the SQLite write lock is released between
+# batches instead of being held for the whole import.
+# benchmarks/csv_import.py compares this with one ORM Movie per row and a
+# single commit at the end (100,000 rows, SQLite on local disk):
+#
+#     ORM add() + one commit                 ~3,800 rows/s
+#     Core executemany, commit every 5,000   ~6,000 rows/s
+#
+# Most of what is left is the movie_fts / movie_trigram triggers indexing
+# each row; with them dropped the Core path runs at ~22,000 rows/s.
+#
+# Rows are matched to existing movies on the ux_movie_title_key_year natural
+# key. In "insert" mode a row whose movie already exists is left alone
+# (ON CONFLICT DO NOTHING); in "upsert" mode it is updated with
+# ON CONFLICT DO UPDATE ... WHERE <some column differs>, so re-running the
+# same nightly export rewrites only the movies that actually changed and the
+# FTS triggers fire only for those. An upsert only writes the columns the
+# file's header has, so a narrower export never blanks the others, and an
+# empty poster never replaces an existing one. Posters are filled in with a
+# placeholder after the INSERT, for the new rows only.
+
+import csv
+import io
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from cache import bump_catalog_version
+from sqlalchemy import func, or_
+from sqlalchemy.dialects.sqlite import insert
+from models import (
+    db, favorites, normalize_title, ImportJob, Movie, UserStats, MOVIE_NATURAL_KEY,
+)
+from search import reset_title_indexes
+from utilities import compile_csv_extractor, parse_year, parse_rating
+
+log = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = 5000
+IMPORT_MODES = ("insert", "upsert")
+
+# Movie column, the CSV header names it may appear under (first match
+# wins), and the parser applied to its value
+CSV_COLUMNS = (
+    ("title", ("Series_Title", "Title", "movie_title", "name", "title"), None),
+    ("year", ("Released_Year", "year", "Year"), parse_year),
+    ("genre", ("Genre", "genre", "genres"), None),
+    ("director", ("Director", "director", "directed_by"), None),
+    ("rating", ("IMDB_Rating", "rating", "imdb_rating", "Rating"), parse_rating),
+    ("description", ("Overview", "description", "plot", "Plot", "Summary"), None),
+    ("poster_url", ("Poster_Link", "poster_url", "Poster"), None),
+)
+
+# Columns an upsert copies from the CSV onto an existing movie
+UPSERT_COLUMNS = ("title", "genre", "director", "rating", "description", "poster_url")
+
+
+@dataclass
+class ImportResult:
+    imported: int = 0    # rows inserted, or updated in upsert mode
+    unchanged: int = 0   # rows whose movie already existed as-is
+    skipped: int = 0     # rows without a title
+    seconds: float = 0.0
+    error: str = None    # set if the import stopped part-way
+    resumed_rows: int = 0  # rows an earlier, interrupted run committed
+
+    @property
+    def rows_processed(self):
+        return self.imported + self.unchanged + self.skipped
+
+    @property
+    def rows_per_second(self):
+        """Rate of this run alone, not counting the resumed rows."""
+        rows = self.rows_processed - self.resumed_rows
+        return rows / self.seconds if self.seconds else 0.0
+
+
+def open_csv_stream(raw):
+    """Text stream over a binary file of CSV data, decoded as it is read.
+
+    utf-8-sig drops the byte-order mark Excel puts in front of the header.
+    """
+    return io.TextIOWrapper(raw, encoding="utf-8-sig", errors="replace", newline="")
+
+
+def csv_header_columns(fieldnames):
+    """Names of the CSV_COLUMNS present in a header row."""
+    header = set(fieldnames or ())
+    return {column for column, names, _ in CSV_COLUMNS if header.intersection(names)}
+
+
+def movie_row_reader(fieldnames):
+    """Compile the CSV_COLUMNS mapping for one file's header row.
+
+    Returns a function giving the column values for one csv.reader row,
+    or None if the row has no title. poster_url is None when the row has
+    none; see _fill_placeholder_posters().
+    """
+    extract = compile_csv_extractor(
+        fieldnames, [(names, parse) for _, names, parse in CSV_COLUMNS]
+    )
+
+    def movie_values(row):
+        title, year, genre, director, rating, description, poster_url = extract(row)
+        if not title:
+            return None
+        return {
+            "title": title,
+            "title_key": normalize_title(title),
+            "year": year,
+            "genre": genre,
+            "director": director,
+            "rating": rating,
+            "description": description,
+            "poster_url": poster_url,
+        }
+    return movie_values
+
+
+def batch_statement(mode="insert", columns=UPSERT_COLUMNS):
+    """INSERT for one batch of movie_row_reader() rows in the given import mode
+
+    Args:
+        mode: "insert" or "upsert"
+        columns: in upsert mode, the columns the CSV has (csv_header_columns);
+            only those are compared and copied onto existing movies
+    """
+    stmt = insert(Movie.__table__)
+    if mode == "insert":
+        return stmt.on_conflict_do_nothing(index_elements=list(MOVIE_NATURAL_KEY))
+    if mode != "upsert":
+        raise ValueError(f"Unknown import mode: {mode!r}")
+
+    movie = Movie.__table__.c
+    new_values = {name: stmt.excluded[name] for name in UPSERT_COLUMNS if name in columns}
+    if "poster_url" in new_values:
+        new_values["poster_url"] = func.coalesce(stmt.excluded.poster_url, movie.poster_url)
+    if not new_values:
+        return stmt.on_conflict_do_nothing(index_elements=list(MOVIE_NATURAL_KEY))
+
+    changed = or_(*(movie[name].is_distinct_from(value)
+                    for name, value in new_values.items()))
+    return stmt.on_conflict_do_update(
+        index_elements=list(MOVIE_NATURAL_KEY),
+        set_={**new_values, "updated_at": stmt.excluded.updated_at},
+        where=changed,
+    )
+
+
+def import_movies(stream, batch_size=IMPORT_BATCH_SIZE, progress=None, mode="insert",
+                  resume=None):
+    """Import movies from a CSV text stream, committing every batch.
+
+    Args:
+        stream: text stream of CSV data (see open_csv_stream)
+        batch_size: rows per INSERT executemany + COMMIT
+        progress: optional callable, given the ImportResult after each batch
+            and before its commit, so what it writes commits with the batch
+        mode: "insert" to skip movies that already exist, "upsert" to
+            update them where the CSV differs
+        resume: optional ImportResult of an interrupted import of the same
+            stream; its rows are skipped and its counts carried over
+
+    Returns:
+        ImportResult. If a batch fails, it is rolled back, `error` is set and
+        `imported` counts the rows already committed.
+    """
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"Unknown import mode: {mode!r}")
+    result = ImportResult()
+    if resume is not None:
+        result.imported, result.unchanged = resume.imported, resume.unchanged
+        result.skipped = resume.skipped
+        result.resumed_rows = result.rows_processed
+    to_skip = result.resumed_rows
+    started = time.perf_counter()
+    batch = []
+    try:
+        reader = csv.reader(stream)
+        header = next(reader, None)
+        stmt = batch_statement(mode, csv_header_columns(header))
+        movie_values = movie_row_reader(header)
+        for row in reader:
+            if not row:
+                continue  # blank line, skipped like csv.DictReader does
+            if to_skip:
+                to_skip -= 1  # committed by the interrupted run
+                continue
+            values = movie_values(row)
+            if values is None:
+                result.skipped += 1
+                continue
+            batch.append(values)
+            if len(batch) >= batch_size:
+                _commit_batch(stmt, batch, result, started, progress)
+                batch = []
+        if batch:
+            _commit_batch(stmt, batch, result, started, progress)
+    except Exception as e:
+        db.session.rollback()
+        result.error = str(e)
+
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def _commit_batch(stmt, batch, result, started, progress):
+    last_id = db.session.scalar(db.select(func.max(Movie.id))) or 0
+    # executemany rowcount is the number of rows inserted or updated;
+    # conflicts that did nothing are not counted
+    written = db.session.execute(stmt, batch).rowcount
+    _fill_placeholder_posters(last_id)
+    result.imported += written
+    result.unchanged += len(batch) - written
+    result.seconds = time.perf_counter() - started
+    if progress:
+        progress(result)
+    db.session.commit()
+
+
+def _fill_placeholder_posters(last_id):
+    """Give movies inserted after id `last_id` without a poster a placeholder.
+
+    New rows get ids above the previous max(id), so this is a rowid range
+    update; it does not touch the FTS triggers (poster_url is not indexed).
+    """
+    movie = Movie.__table__.c
+    db.session.execute(
+        Movie.__table__.update()
+        .where(movie.id > last_id, movie.poster_url.is_(None))
+        .values(poster_url=db.literal("https://placehold.co/300x450/gray/white?text=")
+                .concat(func.replace(movie.title, " ", "+")))
+    )
+
+
+# ============================================================================
+# BACKGROUND IMPORT JOBS
+# ============================================================================
+# import_csv only spools the upload to disk and queues an ImportJob, so the
+# request returns at once. A single worker thread runs the jobs one after
+# another (SQLite has one writer anyway) and records progress on the job
+# row after every batch, which /import_jobs/<id> reports.
+#
+# Several worker processes may see the same queued job (each one sweeps for
+# orphaned jobs), so a job only runs after a conditional UPDATE moves it
+# from queued to running. Every progress write also refreshes heartbeat_at;
+# a running job whose heartbeat is older than IMPORT_LEASE belonged to a
+# process that died, and the next sweep puts it back in the queue.
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="csv-import")
+_submitted = set()      # job ids waiting in or running on this _executor
+_submitted_lock = threading.Lock()
+
+IMPORT_LEASE = timedelta(minutes=5)
+
+
+def spool_upload(file, directory):
+    """Save an uploaded file to `directory` under a unique name; return its path."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{uuid.uuid4().hex}.csv")
+    file.save(path)
+    return path
+
+
+def start_import_job(app, file, user_id=None, mode="insert"):
+    """Spool `file`, create its ImportJob and queue it. Returns the job."""
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"Unknown import mode: {mode!r}")
+    path = spool_upload(file, os.path.join(app.instance_path, "imports"))
+    job = ImportJob(filename=file.filename, path=path, mode=mode, created_by=user_id)
+    db.session.add(job)
+    db.session.commit()
+    _submit(app, job.id)
+    return job
+
+
+def _submit(app, job_id):
+    """Queue `job_id` on this process's executor unless it is already there."""
+    with _submitted_lock:
+        if job_id in _submitted:
+            return False
+        _submitted.add(job_id)
+    _executor.submit(_run_job, app, job_id)
+    return True
+
+
+def resume_import_jobs(app):
+    """Queue jobs that no live process is working on.
+
+    A running job whose heartbeat is older than IMPORT_LEASE goes back to
+    queued first. Every queued job is then submitted here as well: if
+    another worker still holds it, whichever reaches it first claims it and
+    the other skips it. A job whose spooled file is gone is marked failed.
+    Batches a job had already committed are matched on the natural key when
+    it runs again, so they are not imported twice.
+
+    Returns:
+        Number of jobs queued on this process
+    """
+    with app.app_context():
+        now = datetime.now(timezone.utc)
+        db.session.execute(
+            db.update(ImportJob)
+            .where(ImportJob.status == "running",
+                   or_(ImportJob.heartbeat_at.is_(None),
+                       ImportJob.heartbeat_at < now - IMPORT_LEASE))
+            .values(status="queued")
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+        queued = db.session.execute(
+            db.select(ImportJob.id, ImportJob.path).where(ImportJob.status == "queued")
+        ).all()
+        resumable = []
+        for job_id, path in queued:
+            if os.path.exists(path):
+                resumable.append(job_id)
+                continue
+            db.session.execute(
+                db.update(ImportJob)
+                .where(ImportJob.id == job_id, ImportJob.status == "queued")
+                .values(status="failed", error="Interrupted by a server restart",
+                        finished_at=now)
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+    return sum(_submit(app, job_id) for job_id in resumable)
+
+
+def start_import_resumer(app, interval=IMPORT_LEASE.total_seconds() / 2):
+    """Run resume_import_jobs() now and every `interval` seconds after.
+
+    A sweep at startup alone would miss a worker that dies while its
+    siblings keep running, or one restarted before its lease ran out.
+    """
+    def run():
+        while True:
+            try:
+                resume_import_jobs(app)
+            except Exception:
+                log.exception("Resuming import jobs failed")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name="csv-import-resume", daemon=True)
+    thread.start()
+    return thread
+
+
+def _run_job(app, job_id):
+    with app.app_context():
+        try:
+            run_import_job(job_id, app.config.get("IMPORT_BATCH_SIZE", IMPORT_BATCH_SIZE))
+        except Exception:
+            db.session.rollback()
+            log.exception("Import job %s crashed", job_id)
+            job = db.session.get(ImportJob, job_id)
+            if job is not None:
+                job.status, job.error = "failed", "Internal error"
+                job.finished_at = datetime.now(timezone.utc)
+                db.session.commit()
+        finally:
+            with _submitted_lock:
+                _submitted.discard(job_id)
+
+
+def claim_import_job(job_id):
+    """Move a queued job to running. False if another worker got it first."""
+    now = datetime.now(timezone.utc)
+    claimed = db.session.execute(
+        db.update(ImportJob)
+        .where(ImportJob.id == job_id, ImportJob.status == "queued")
+        .values(status="running", heartbeat_at=now,
+                started_at=func.coalesce(ImportJob.started_at, now))
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+    db.session.commit()
+    return claimed
+
+
+def run_import_job(job_id, batch_size=IMPORT_BATCH_SIZE):
+    """Import a queued job's spooled file, updating the job as it goes.
+
+    The job's counters are written in each batch's transaction, so they
+    always describe the rows committed so far. A resumed job skips those
+    rows, carries the counters on and keeps its first started_at, so the
+    follow-up work below covers what earlier runs wrote as well.
+    """
+    if not claim_import_job(job_id):
+        return
+    job = db.session.get(ImportJob, job_id)
+    committed = ImportResult(imported=job.imported, unchanged=job.unchanged,
+                             skipped=job.skipped)
+
+    def record(result):
+        job.imported, job.skipped = result.imported, result.skipped
+        job.unchanged = result.unchanged
+        job.rows_per_second = result.rows_per_second
+        job.heartbeat_at = datetime.now(timezone.utc)
+        db.session.commit()
+
+    try:
+        with open(job.path, "rb") as raw:
+            result = import_movies(open_csv_stream(raw), batch_size=batch_size,
+                                   progress=record, mode=job.mode, resume=committed)
+    finally:
+        os.remove(job.path)
+
+    if result.imported:
+        bump_catalog_version()
+        reset_title_indexes()
+        if job.mode == "upsert":
+            # Updated ratings / genres feed the fans' dashboard totals
+            UserStats.rebuild(users_of_movies_updated_since(job.started_at))
+
+    record(result)
+    job.status = "failed" if result.error else "done"
+    job.error = result.error
+    job.finished_at = datetime.now(timezone.utc)
+    db.session.commit()
+
+
+def users_of_movies_updated_since(since):
+    """Ids of users who favorited a movie updated at or after `since`"""
+    return db.session.scalars(
+        db.select(favorites.c.user_id).distinct()
+        .join(Movie, Movie.id == favorites.c.movie_id)
+        .where(Movie.updated_at >= since)
+    ).all()
@@ -0,0 +1,27 @@
+"""add heartbeat_at to import_job
+
+Revision ID: 0c9e4b7a2d58
+Revises: f2a7d9c4e1b6
+Create Date: 2026-10-17 17:58:41.236904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c9e4b7a2d58'
+down_revision = 'f2a7d9c4e1b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Running jobs keep a NULL heartbeat, so the next sweep re-queues them
+    with op.batch_alter_table('import_job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('import_job', schema=None) as batch_op:
+        batch_op.drop_column('heartbeat_at')
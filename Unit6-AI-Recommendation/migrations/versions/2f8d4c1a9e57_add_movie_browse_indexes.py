@@ -0,0 +1,35 @@
+"""add movie browse indexes
+
+Revision ID: 2f8d4c1a9e57
+Revises: 9b1e6f2a7c3d
+Create Date: 2026-10-17 10:03:12.581930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f8d4c1a9e57'
+down_revision = '9b1e6f2a7c3d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('movie', schema=None) as batch_op:
+        batch_op.create_index('ix_movie_genre_rating', ['genre', 'rating'], unique=False)
+        batch_op.create_index('ix_movie_year_rating', ['year', 'rating'], unique=False)
+        batch_op.create_index('ix_movie_rating_id', ['rating', 'id'], unique=False)
+        batch_op.create_index('ix_movie_created_at', ['created_at'], unique=False)
+
+    # Refresh planner statistics so SQLite picks the new indexes right away
+    op.execute('ANALYZE movie')
+
+
+def downgrade():
+    with op.batch_alter_table('movie', schema=None) as batch_op:
+        batch_op.drop_index('ix_movie_created_at')
+        batch_op.drop_index('ix_movie_rating_id')
+        batch_op.drop_index('ix_movie_year_rating')
+        batch_op.drop_index('ix_movie_genre_rating')
@@ -0,0 +1,58 @@
+"""add event timestamps and trending_score tables
+
+Revision ID: 5d7a0c3e9f12
+Revises: e81d3f6b2a49
+Create Date: 2026-10-17 14:02:57.118406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d7a0c3e9f12'
+down_revision = 'e81d3f6b2a49'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('trending_score',
+    sa.Column('movie_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['movie_id'], ['movie.id'], ),
+    sa.PrimaryKeyConstraint('movie_id')
+    )
+    with op.batch_alter_table('trending_score', schema=None) as batch_op:
+        batch_op.create_index('ix_trending_score_score', ['score'], unique=False)
+
+    op.create_table('trending_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # Existing rows keep a NULL timestamp: they predate the trending window
+    with op.batch_alter_table('favorites', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(timezone=True), nullable=True))
+        batch_op.create_index('ix_favorites_created_at', ['created_at'], unique=False)
+
+    with op.batch_alter_table('watchlist', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(timezone=True), nullable=True))
+        batch_op.create_index('ix_watchlist_created_at', ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('watchlist', schema=None) as batch_op:
+        batch_op.drop_index('ix_watchlist_created_at')
+        batch_op.drop_column('created_at')
+
+    with op.batch_alter_table('favorites', schema=None) as batch_op:
+        batch_op.drop_index('ix_favorites_created_at')
+        batch_op.drop_column('created_at')
+
+    op.drop_table('trending_state')
+    with op.batch_alter_table('trending_score', schema=None) as batch_op:
+        batch_op.drop_index('ix_trending_score_score')
+
+    op.drop_table('trending_score')
@@ -0,0 +1,59 @@
+"""add movie_trigram fuzzy title index
+
+Revision ID: 6a3c9e0d5b14
+Revises: 2f8d4c1a9e57
+Create Date: 2026-10-17 11:26:44.019357
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a3c9e0d5b14'
+down_revision = '2f8d4c1a9e57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS movie_trigram USING fts5(
+            title,
+            content='movie', content_rowid='id',
+            tokenize='trigram', detail='none'
+        )
+    """)
+    op.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS movie_trigram_vocab
+        USING fts5vocab(movie_trigram, 'row')
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS movie_trigram_ai AFTER INSERT ON movie BEGIN
+            INSERT INTO movie_trigram(rowid, title) VALUES (new.id, new.title);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS movie_trigram_ad AFTER DELETE ON movie BEGIN
+            INSERT INTO movie_trigram(movie_trigram, rowid, title)
+            VALUES ('delete', old.id, old.title);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS movie_trigram_au AFTER UPDATE OF title ON movie BEGIN
+            INSERT INTO movie_trigram(movie_trigram, rowid, title)
+            VALUES ('delete', old.id, old.title);
+            INSERT INTO movie_trigram(rowid, title) VALUES (new.id, new.title);
+        END
+    """)
+
+    # Backfill the trigram index from the existing titles
+    op.execute("INSERT INTO movie_trigram(movie_trigram) VALUES ('rebuild')")
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS movie_trigram_au")
+    op.execute("DROP TRIGGER IF EXISTS movie_trigram_ad")
+    op.execute("DROP TRIGGER IF EXISTS movie_trigram_ai")
+    op.execute("DROP TABLE IF EXISTS movie_trigram_vocab")
+    op.execute("DROP TABLE IF EXISTS movie_trigram")
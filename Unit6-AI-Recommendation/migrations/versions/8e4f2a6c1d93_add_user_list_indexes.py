@@ -0,0 +1,32 @@
+"""add (user_id, created_at) indexes to favorites and watchlist
+
+Revision ID: 8e4f2a6c1d93
+Revises: d6b41f8e2c75
+Create Date: 2026-10-17 16:31:05.482217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4f2a6c1d93'
+down_revision = 'd6b41f8e2c75'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('favorites', schema=None) as batch_op:
+        batch_op.create_index('ix_favorites_user_created', ['user_id', 'created_at', 'movie_id'], unique=False)
+
+    with op.batch_alter_table('watchlist', schema=None) as batch_op:
+        batch_op.create_index('ix_watchlist_user_created', ['user_id', 'created_at', 'movie_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('watchlist', schema=None) as batch_op:
+        batch_op.drop_index('ix_watchlist_user_created')
+
+    with op.batch_alter_table('favorites', schema=None) as batch_op:
+        batch_op.drop_index('ix_favorites_user_created')
@@ -0,0 +1,58 @@
+"""add movie_fts full-text search index
+
+Revision ID: 9b1e6f2a7c3d
+Revises: 4c60222fac78
+Create Date: 2026-10-17 09:12:31.204118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b1e6f2a7c3d'
+down_revision = '4c60222fac78'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS movie_fts USING fts5(
+            title, director, description,
+            content='movie', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS movie_fts_ai AFTER INSERT ON movie BEGIN
+            INSERT INTO movie_fts(rowid, title, director, description)
+            VALUES (new.id, new.title, new.director, new.description);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS movie_fts_ad AFTER DELETE ON movie BEGIN
+            INSERT INTO movie_fts(movie_fts, rowid, title, director, description)
+            VALUES ('delete', old.id, old.title, old.director, old.description);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS movie_fts_au
+        AFTER UPDATE OF title, director, description ON movie BEGIN
+            INSERT INTO movie_fts(movie_fts, rowid, title, director, description)
+            VALUES ('delete', old.id, old.title, old.director, old.description);
+            INSERT INTO movie_fts(rowid, title, director, description)
+            VALUES (new.id, new.title, new.director, new.description);
+        END
+    """)
+
+    # Backfill the index from the rows already in the movie table
+    op.execute("INSERT INTO movie_fts(movie_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS movie_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS movie_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS movie_fts_ai")
+    op.execute("DROP TABLE IF EXISTS movie_fts")
@@ -0,0 +1,67 @@
+"""add user_stats and user_genre_stats tables
+
+Revision ID: a3f9b6d18c20
+Revises: 5d7a0c3e9f12
+Create Date: 2026-10-17 14:48:10.522873
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f9b6d18c20'
+down_revision = '5d7a0c3e9f12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('favorite_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('watchlist_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('rating_sum', sa.Float(), server_default='0', nullable=False),
+    sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('user_genre_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('genre', sa.String(length=50), nullable=False),
+    sa.Column('favorite_count', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'genre')
+    )
+
+    # Backfill from the existing favorites / watchlist rows
+    op.execute("""
+        INSERT INTO user_stats (user_id, favorite_count, watchlist_count,
+                                rating_sum, rating_count)
+        SELECT u.id,
+               COALESCE(f.n, 0), COALESCE(w.n, 0),
+               COALESCE(f.rating_sum, 0), COALESCE(f.rating_count, 0)
+        FROM user u
+        LEFT JOIN (
+            SELECT favorites.user_id, count(*) AS n,
+                   sum(movie.rating) AS rating_sum, count(movie.rating) AS rating_count
+            FROM favorites JOIN movie ON movie.id = favorites.movie_id
+            GROUP BY favorites.user_id
+        ) f ON f.user_id = u.id
+        LEFT JOIN (
+            SELECT user_id, count(*) AS n FROM watchlist GROUP BY user_id
+        ) w ON w.user_id = u.id
+        WHERE f.n IS NOT NULL OR w.n IS NOT NULL
+    """)
+    op.execute("""
+        INSERT INTO user_genre_stats (user_id, genre, favorite_count)
+        SELECT favorites.user_id, movie.genre, count(*)
+        FROM favorites JOIN movie ON movie.id = favorites.movie_id
+        WHERE movie.genre IS NOT NULL AND movie.genre != ''
+        GROUP BY favorites.user_id, movie.genre
+    """)
+
+
+def downgrade():
+    op.drop_table('user_genre_stats')
+    op.drop_table('user_stats')
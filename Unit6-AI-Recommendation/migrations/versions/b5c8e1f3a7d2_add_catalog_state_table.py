@@ -0,0 +1,42 @@
+"""add catalog_state table
+
+Revision ID: b5c8e1f3a7d2
+Revises: 8e4f2a6c1d93
+Create Date: 2026-10-17 16:48:22.615390
+
+"""
+from datetime import datetime, timezone
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5c8e1f3a7d2'
+down_revision = '8e4f2a6c1d93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('catalog_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('modified_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Seeded so every worker sends the same Last-Modified / ETag from the
+    # start, rather than its own start time until the first catalog write
+    catalog_state = sa.table('catalog_state',
+        sa.column('id', sa.Integer()),
+        sa.column('version', sa.Integer()),
+        sa.column('modified_at', sa.DateTime(timezone=True)),
+    )
+    op.bulk_insert(catalog_state, [{
+        'id': 1,
+        'version': 0,
+        'modified_at': datetime.now(timezone.utc).replace(microsecond=0),
+    }])
+
+
+def downgrade():
+    op.drop_table('catalog_state')
@@ -0,0 +1,30 @@
+"""add updated_at to movie
+
+Revision ID: c47e2b8a1f90
+Revises: 6a3c9e0d5b14
+Create Date: 2026-10-17 12:40:08.735112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47e2b8a1f90'
+down_revision = '6a3c9e0d5b14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('movie', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+
+    # Existing movies have not changed since they were added
+    op.execute("UPDATE movie SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)")
+
+
+def downgrade():
+    # Plain ALTER TABLE DROP COLUMN (SQLite 3.35+): a batch copy of the table
+    # would silently drop the movie_fts / movie_trigram triggers
+    op.drop_column('movie', 'updated_at')
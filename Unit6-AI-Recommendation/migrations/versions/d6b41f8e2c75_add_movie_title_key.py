@@ -0,0 +1,114 @@
+"""add movie title_key natural key and import_job mode
+
+Revision ID: d6b41f8e2c75
+Revises: 71c2e5a9d3b8
+Create Date: 2026-10-17 16:12:48.903215
+
+"""
+import re
+import unicodedata
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6b41f8e2c75'
+down_revision = '71c2e5a9d3b8'
+branch_labels = None
+depends_on = None
+
+
+def normalize_title(text):
+    # Frozen copy of models.normalize_title as of this revision
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def upgrade():
+    # Plain ADD COLUMN: a batch rebuild of movie would drop the FTS triggers
+    op.add_column('movie', sa.Column('title_key', sa.String(length=200), nullable=True))
+    with op.batch_alter_table('import_job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('mode', sa.String(length=10), server_default='insert', nullable=False))
+        batch_op.add_column(sa.Column('unchanged', sa.Integer(), server_default='0', nullable=False))
+
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, title FROM movie")).all()
+    if rows:
+        conn.execute(sa.text("UPDATE movie SET title_key = :key WHERE id = :id"),
+                     [{"id": id, "key": normalize_title(title)} for id, title in rows])
+
+    # Earlier CSV re-imports left duplicates; keep the oldest row of each
+    # title + year (movies without a year match on title alone) and move
+    # favorites / watchlist entries onto it
+    dupes = conn.execute(sa.text("""
+        SELECT m.id, keep.id FROM movie m
+        JOIN (SELECT title_key, coalesce(year, 0) AS year_key, min(id) AS id
+              FROM movie GROUP BY title_key, coalesce(year, 0)
+              HAVING count(*) > 1) keep
+          ON keep.title_key = m.title_key AND keep.year_key = coalesce(m.year, 0)
+        WHERE m.id != keep.id
+    """)).all()
+    for dupe_id, keep_id in dupes:
+        params = {"dupe": dupe_id, "keep": keep_id}
+        for assoc in ('favorites', 'watchlist'):
+            conn.execute(sa.text(f"UPDATE OR IGNORE {assoc} SET movie_id = :keep "
+                                 f"WHERE movie_id = :dupe"), params)
+            conn.execute(sa.text(f"DELETE FROM {assoc} WHERE movie_id = :dupe"), params)
+        conn.execute(sa.text("DELETE FROM trending_score WHERE movie_id = :dupe"), params)
+        tmdb_id = conn.execute(sa.text("SELECT tmdb_id FROM movie WHERE id = :dupe"),
+                               params).scalar()
+        conn.execute(sa.text("DELETE FROM movie WHERE id = :dupe"), params)
+        if tmdb_id is not None:
+            conn.execute(sa.text("UPDATE movie SET tmdb_id = :tmdb_id "
+                                 "WHERE id = :keep AND tmdb_id IS NULL"),
+                         {**params, "tmdb_id": tmdb_id})
+
+    if dupes:
+        op.execute("""
+            UPDATE movie SET
+                favorite_count = (SELECT count(*) FROM favorites WHERE movie_id = movie.id),
+                watchlist_count = (SELECT count(*) FROM watchlist WHERE movie_id = movie.id)
+        """)
+        # Users who had two copies of a movie lost one; recount everyone
+        op.execute("DELETE FROM user_genre_stats")
+        op.execute("DELETE FROM user_stats")
+        op.execute("""
+            INSERT INTO user_stats (user_id, favorite_count, watchlist_count,
+                                    rating_sum, rating_count)
+            SELECT u.id,
+                   COALESCE(f.n, 0), COALESCE(w.n, 0),
+                   COALESCE(f.rating_sum, 0), COALESCE(f.rating_count, 0)
+            FROM user u
+            LEFT JOIN (
+                SELECT favorites.user_id, count(*) AS n,
+                       sum(movie.rating) AS rating_sum, count(movie.rating) AS rating_count
+                FROM favorites JOIN movie ON movie.id = favorites.movie_id
+                GROUP BY favorites.user_id
+            ) f ON f.user_id = u.id
+            LEFT JOIN (
+                SELECT user_id, count(*) AS n FROM watchlist GROUP BY user_id
+            ) w ON w.user_id = u.id
+            WHERE f.n IS NOT NULL OR w.n IS NOT NULL
+        """)
+        op.execute("""
+            INSERT INTO user_genre_stats (user_id, genre, favorite_count)
+            SELECT favorites.user_id, movie.genre, count(*)
+            FROM favorites JOIN movie ON movie.id = favorites.movie_id
+            WHERE movie.genre IS NOT NULL AND movie.genre != ''
+            GROUP BY favorites.user_id, movie.genre
+        """)
+
+    op.create_index('ux_movie_title_key_year', 'movie',
+                    ['title_key', sa.text('coalesce(year, 0)')], unique=True)
+
+
+def downgrade():
+    op.drop_index('ux_movie_title_key_year', table_name='movie')
+    with op.batch_alter_table('import_job', schema=None) as batch_op:
+        batch_op.drop_column('unchanged')
+        batch_op.drop_column('mode')
+
+    # Plain DROP COLUMN (SQLite 3.35+): batch mode would recreate movie
+    # and lose the FTS triggers
+    op.drop_column('movie', 'title_key')
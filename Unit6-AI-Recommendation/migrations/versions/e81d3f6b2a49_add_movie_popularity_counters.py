@@ -0,0 +1,43 @@
+"""add favorite/watchlist counters to movie
+
+Revision ID: e81d3f6b2a49
+Revises: c47e2b8a1f90
+Create Date: 2026-10-17 13:21:44.905316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e81d3f6b2a49'
+down_revision = 'c47e2b8a1f90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('movie', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('favorite_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('watchlist_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index('ix_movie_popularity', ['favorite_count', 'watchlist_count'], unique=False)
+
+    # Backfill from the association tables (one pass over each)
+    op.execute("""
+        UPDATE movie SET
+            favorite_count = (SELECT count(*) FROM favorites
+                              WHERE favorites.movie_id = movie.id),
+            watchlist_count = (SELECT count(*) FROM watchlist
+                               WHERE watchlist.movie_id = movie.id)
+    """)
+    op.execute('ANALYZE movie')
+
+
+def downgrade():
+    with op.batch_alter_table('movie', schema=None) as batch_op:
+        batch_op.drop_index('ix_movie_popularity')
+
+    # Plain ALTER TABLE DROP COLUMN (SQLite 3.35+): a batch copy of the table
+    # would silently drop the movie_fts / movie_trigram triggers
+    op.drop_column('movie', 'watchlist_count')
+    op.drop_column('movie', 'favorite_count')
@@ -0,0 +1,35 @@
+"""add trending_credit table
+
+Revision ID: f2a7d9c4e1b6
+Revises: b5c8e1f3a7d2
+Create Date: 2026-10-17 17:31:09.402718
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a7d9c4e1b6'
+down_revision = 'b5c8e1f3a7d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('trending_credit',
+    sa.Column('source', sa.String(length=20), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('movie_id', sa.Integer(), nullable=False),
+    sa.Column('credited_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('source', 'user_id', 'movie_id')
+    )
+    with op.batch_alter_table('trending_credit', schema=None) as batch_op:
+        batch_op.create_index('ix_trending_credit_credited_at', ['credited_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('trending_credit', schema=None) as batch_op:
+        batch_op.drop_index('ix_trending_credit_credited_at')
+
+    op.drop_table('trending_credit')
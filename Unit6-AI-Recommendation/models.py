@@ -2,7 +2,13 @@
 # models.py - CineMatch Database Models (Fixed for SQLite + Alembic)
 # ============================================================================
 
+import re
+import unicodedata
 from flask_sqlalchemy import SQLAlchemy
+from collections import defaultdict
+from sqlalchemy import DDL, event
+from sqlalchemy.orm import load_only, validates
+from sqlalchemy.dialects.sqlite import insert
 from datetime import datetime, timezone
 from flask_login import UserMixin
 from flask_bcrypt import Bcrypt
@@ -15,16 +21,29 @@ bcrypt = Bcrypt()
 # ASSOCIATION TABLE: User ↔ Movie Favorites
 # ============================================================================
 
+# created_at timestamps each favorite / watchlist add; trending.py folds
+# new rows into trending_score by scanning the created_at index, and the
+# dashboard reads a user's newest rows straight off (user_id, created_at,
+# movie_id) instead of sorting them
+
 favorites = db.Table(
     'favorites',
     db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
-    db.Column('movie_id', db.Integer, db.ForeignKey('movie.id'), primary_key=True)
+    db.Column('movie_id', db.Integer, db.ForeignKey('movie.id'), primary_key=True),
+    db.Column('created_at', db.DateTime(timezone=True),
+              default=lambda: datetime.now(timezone.utc)),
+    db.Index('ix_favorites_created_at', 'created_at'),
+    db.Index('ix_favorites_user_created', 'user_id', 'created_at', 'movie_id'),
 )
 
 watchlist = db.Table(
     'watchlist',
     db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
-    db.Column('movie_id', db.Integer, db.ForeignKey('movie.id'), primary_key=True)
+    db.Column('movie_id', db.Integer, db.ForeignKey('movie.id'), primary_key=True),
+    db.Column('created_at', db.DateTime(timezone=True),
+              default=lambda: datetime.now(timezone.utc)),
+    db.Index('ix_watchlist_created_at', 'created_at'),
+    db.Index('ix_watchlist_user_created', 'user_id', 'created_at', 'movie_id'),
 )
 
 
@@ -62,6 +81,151 @@ class User(UserMixin, db.Model):
     def check_password(self, password):
         return bcrypt.check_password_hash(self.password_hash, password)
 
+    # ------------------------
+    # Membership helpers
+    # ------------------------
+    # One EXISTS probe on the association table's (user_id, movie_id)
+    # primary key, instead of loading the whole relationship to test "in"
+    def has_favorite(self, movie):
+        """True if `movie` (a Movie or its id) is in this user's favorites"""
+        return self._has_row(favorites, movie)
+
+    def has_in_watchlist(self, movie):
+        """True if `movie` (a Movie or its id) is on this user's watchlist"""
+        return self._has_row(watchlist, movie)
+
+    # ------------------------
+    # Favorite / watchlist writes
+    # ------------------------
+    # One INSERT ... ON CONFLICT DO NOTHING or DELETE per toggle, plus the
+    # counter UPDATE when a row actually changed. The lists are never
+    # loaded, and a double-click is a no-op instead of an IntegrityError.
+    # Callers commit.
+    def add_favorite(self, movie):
+        """Favorite `movie` (a Movie or id); False if it already was"""
+        return self._add_row(favorites, movie, favorites=1)
+
+    def remove_favorite(self, movie):
+        """Unfavorite `movie` (a Movie or id); False if it was not a favorite"""
+        return self._remove_row(favorites, movie, favorites=-1)
+
+    def add_to_watchlist(self, movie):
+        """Put `movie` on the watchlist; False if it was already there"""
+        return self._add_row(watchlist, movie, watchlist=1)
+
+    def remove_from_watchlist(self, movie):
+        """Take `movie` off the watchlist; False if it was not there"""
+        return self._remove_row(watchlist, movie, watchlist=-1)
+
+    def _add_row(self, table, movie, **counts):
+        movie_id = getattr(movie, 'id', movie)
+        result = db.session.execute(
+            insert(table)
+            .values(user_id=self.id, movie_id=movie_id)
+            .on_conflict_do_nothing()
+        )
+        if result.rowcount:
+            Movie.adjust_counts(movie_id, **counts)
+            UserStats.record(self.id, movie_id, **counts)
+        return bool(result.rowcount)
+
+    def _remove_row(self, table, movie, **counts):
+        movie_id = getattr(movie, 'id', movie)
+        result = db.session.execute(
+            db.delete(table).where(table.c.user_id == self.id,
+                                   table.c.movie_id == movie_id)
+        )
+        if result.rowcount:
+            Movie.adjust_counts(movie_id, **counts)
+            UserStats.record(self.id, movie_id, **counts)
+        return bool(result.rowcount)
+
+    # ------------------------
+    # Dashboard stats
+    # ------------------------
+    def dashboard_stats(self, top=3):
+        """Favorite / watchlist counts, average favorite rating and the most
+        favorited genres, read from the running totals in user_stats
+
+        Returns:
+            dict with fav_count, watch_count, avg_rating, top_genres
+            ([(genre, count)], most favorited first)
+        """
+        stats = db.session.get(UserStats, self.id) or UserStats(
+            favorite_count=0, watchlist_count=0, rating_sum=0, rating_count=0)
+        top_genres = db.session.execute(
+            db.select(UserGenreStats.genre, UserGenreStats.favorite_count)
+            .where(UserGenreStats.user_id == self.id,
+                   UserGenreStats.favorite_count > 0)
+            .order_by(UserGenreStats.favorite_count.desc(), UserGenreStats.genre)
+            .limit(top)
+        ).all()
+
+        return {
+            'fav_count': stats.favorite_count,
+            'watch_count': stats.watchlist_count,
+            'avg_rating': round(stats.avg_rating, 1) if stats.avg_rating else 0,
+            'top_genres': [tuple(row) for row in top_genres],
+        }
+
+    # ------------------------
+    # Dashboard sections
+    # ------------------------
+    def favorites_page(self, page=1, per_page=12):
+        """One page of favorites, newest first: (movies, has_next)"""
+        return self._movies_page(favorites, page, per_page)
+
+    def watchlist_page(self, page=1, per_page=12):
+        """One page of the watchlist, newest first: (movies, has_next)"""
+        return self._movies_page(watchlist, page, per_page)
+
+    def _movies_page(self, table, page, per_page):
+        # The OFFSET walks ix_*_user_created alone, so skipped rows never
+        # touch movie, and only the page itself is re-sorted after the
+        # join. Only the columns a dashboard card shows; one row past the
+        # page tells us whether there is a next one without a COUNT
+        page_rows = (
+            db.select(table.c.movie_id, table.c.created_at)
+            .where(table.c.user_id == self.id)
+            .order_by(table.c.created_at.desc(), table.c.movie_id.desc())
+            .offset((page - 1) * per_page)
+            .limit(per_page + 1)
+            .subquery()
+        )
+        rows = (
+            Movie.query
+            .options(load_only(Movie.id, Movie.title, Movie.poster_url, Movie.rating))
+            .join(page_rows, page_rows.c.movie_id == Movie.id)
+            .order_by(page_rows.c.created_at.desc(), page_rows.c.movie_id.desc())
+            .all()
+        )
+        return rows[:per_page], len(rows) > per_page
+
+    def movie_flags(self, movie_ids):
+        """(favorite ids, watchlist ids) among `movie_ids`
+
+        One IN (...) query per association table, however many movies
+        are on the page.
+        """
+        movie_ids = list(movie_ids)
+        if not movie_ids:
+            return set(), set()
+        return self._ids_in(favorites, movie_ids), self._ids_in(watchlist, movie_ids)
+
+    def _ids_in(self, table, movie_ids):
+        rows = db.session.execute(
+            db.select(table.c.movie_id).where(table.c.user_id == self.id,
+                                              table.c.movie_id.in_(movie_ids))
+        )
+        return set(rows.scalars())
+
+    def _has_row(self, table, movie):
+        movie_id = getattr(movie, 'id', movie)
+        return db.session.query(
+            db.exists().where(table.c.user_id == self.id,
+                              table.c.movie_id == movie_id)
+        ).scalar()
+
     def __repr__(self):
         return f'<User {self.username}>'
 
@@ -70,8 +234,29 @@ class User(UserMixin, db.Model):
 # MOVIE MODEL
 # ============================================================================
 
+def normalize_title(text):
+    """Lowercase, strip accents and collapse punctuation to single spaces."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
 class Movie(db.Model):
     """Movie in the CineMatch catalog"""
+    # Indexes match the /movies query shapes: filter on genre or year, then
+    # ORDER BY rating DESC, id DESC. SQLite keeps the rowid (id) at the end
+    # of every index, so (genre, rating) is already sorted by (rating, id)
+    # within a genre and can be read backwards without a sort step.
+    __table_args__ = (
+        db.Index('ix_movie_genre_rating', 'genre', 'rating'),
+        db.Index('ix_movie_year_rating', 'year', 'rating'),
+        db.Index('ix_movie_rating_id', 'rating', 'id'),
+        db.Index('ix_movie_created_at', 'created_at'),
+        # /popular reads this backwards: most favorited first, ties broken
+        # by watchlist adds, then newest id
+        db.Index('ix_movie_popularity', 'favorite_count', 'watchlist_count'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     year = db.Column(db.Integer)
@@ -81,10 +266,402 @@ class Movie(db.Model):
     description = db.Column(db.Text)
     poster_url = db.Column(db.String(500))
     tmdb_id = db.Column(db.Integer, unique=True, nullable=True)
+    title_key = db.Column(db.String(200))  # normalize_title(title), set by set_title_key()
+    created_at = db.Column(
+        db.DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc)
+    )
+    # Drives ETag / Last-Modified on the movie pages (Lesson 6 perf)
+    updated_at = db.Column(
+        db.DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc)
+    )
+
+    # Denormalized counts of favorites / watchlist rows, kept in step by
+    # adjust_counts() in the same transaction as the association row
+    favorite_count = db.Column(db.Integer, nullable=False, default=0,
+                               server_default='0')
+    watchlist_count = db.Column(db.Integer, nullable=False, default=0,
+                                server_default='0')
+
+    @validates('title')
+    def set_title_key(self, key, title):
+        self.title_key = normalize_title(title)
+        return title
+
+    @staticmethod
+    def find_by_natural_key(title, year):
+        """The movie with this title (after normalize_title) and year, if any"""
+        title_key, year_key = MOVIE_NATURAL_KEY
+        return Movie.query.filter(title_key == normalize_title(title),
+                                  year_key == (year or 0)).first()
+
+    @staticmethod
+    def adjust_counts(movie_id, favorites=0, watchlist=0):
+        """Add to a movie's counters with one UPDATE (not committed)
+
+        updated_at is set to itself so its onupdate doesn't fire: a
+        favorite isn't an edit, and must not move the movie page's ETag /
+        Last-Modified or count as a catalog change for
+        users_of_movies_updated_since().
+        """
+        values = {}
+        if favorites:
+            values[Movie.favorite_count] = Movie.favorite_count + favorites
+        if watchlist:
+            values[Movie.watchlist_count] = Movie.watchlist_count + watchlist
+        if values:
+            values[Movie.updated_at] = Movie.updated_at
+            db.session.execute(
+                db.update(Movie).where(Movie.id == movie_id).values(values)
+            )
+
+    def __repr__(self):
+        return f"<Movie: {self.title} ({self.year})>"
+
+
+# Natural key: one movie per normalized title + year, so re-importing a CSV
+# upserts instead of duplicating. The year goes through coalesce() because
+# SQLite treats NULLs as distinct in a unique index; movies without a year
+# then match on the title alone. ON CONFLICT targets must repeat these
+# exact expressions.
+MOVIE_NATURAL_KEY = (Movie.title_key, db.func.coalesce(Movie.year, db.literal_column('0')))
+db.Index('ux_movie_title_key_year', *MOVIE_NATURAL_KEY, unique=True)
+
+
+# ============================================================================
+# USER STATS (running dashboard totals)
+# ============================================================================
+# Updated by User.add_favorite() & co. in the same transaction as the
+# favorites / watchlist row, so the dashboard reads totals instead of
+# aggregating the user's lists. rebuild() recomputes them from scratch:
+# after a movie's rating or genre is edited, after a movie is deleted,
+# and from `flask repair-user-stats`.
+
+class UserStats(db.Model):
+    """Favorite / watchlist totals for one user"""
+    __tablename__ = 'user_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    favorite_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    watchlist_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Sum and number of the ratings of rated favorites, for the average
+    rating_sum = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    TOTALS = ('favorite_count', 'watchlist_count', 'rating_sum', 'rating_count')
+
+    @property
+    def avg_rating(self):
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
+    @staticmethod
+    def record(user_id, movie_id, favorites=0, watchlist=0):
+        """Add one favorite / watchlist change to a user's totals (not committed)"""
+        rating = genre = None
+        if favorites:
+            rating, genre = db.session.execute(
+                db.select(Movie.rating, Movie.genre).where(Movie.id == movie_id)
+            ).one_or_none() or (None, None)
+
+        stmt = insert(UserStats).values(
+            user_id=user_id,
+            favorite_count=favorites,
+            watchlist_count=watchlist,
+            rating_sum=(rating or 0) * favorites,
+            rating_count=favorites if rating is not None else 0,
+        )
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[UserStats.user_id],
+            set_={name: getattr(UserStats, name) + stmt.excluded[name]
+                  for name in UserStats.TOTALS},
+        ))
+
+        if favorites and genre:
+            stmt = insert(UserGenreStats).values(
+                user_id=user_id, genre=genre, favorite_count=favorites)
+            db.session.execute(stmt.on_conflict_do_update(
+                index_elements=[UserGenreStats.user_id, UserGenreStats.genre],
+                set_={'favorite_count': UserGenreStats.favorite_count
+                      + stmt.excluded.favorite_count},
+            ))
+
+    @staticmethod
+    def users_of(movie_id):
+        """Ids of users whose totals include `movie_id`"""
+        return [user_id for (user_id,) in db.session.execute(
+            db.select(favorites.c.user_id).where(favorites.c.movie_id == movie_id)
+            .union(db.select(watchlist.c.user_id).where(watchlist.c.movie_id == movie_id))
+        )]
+
+    @staticmethod
+    def rebuild(user_ids=None, chunk=500):
+        """Recompute totals from the association tables (not committed)
+
+        Args:
+            user_ids: users to repair, or None for every user
+        Returns:
+            Number of users with a stats row
+        """
+        if user_ids is None:
+            return UserStats._rebuild(None)
+        user_ids = list(user_ids)
+        return sum(UserStats._rebuild(user_ids[i:i + chunk])
+                   for i in range(0, len(user_ids), chunk))
+
+    @staticmethod
+    def _rebuild(user_ids):
+        def only(stmt, column):
+            return stmt if user_ids is None else stmt.where(column.in_(user_ids))
+
+        db.session.execute(only(db.delete(UserGenreStats), UserGenreStats.user_id))
+        db.session.execute(only(db.delete(UserStats), UserStats.user_id))
+
+        totals = defaultdict(lambda: dict.fromkeys(UserStats.TOTALS, 0))
+        fav_rows = db.session.execute(only(
+            db.select(favorites.c.user_id, db.func.count(),
+                      db.func.coalesce(db.func.sum(Movie.rating), 0),
+                      db.func.count(Movie.rating))
+            .join(Movie, Movie.id == favorites.c.movie_id)
+            .group_by(favorites.c.user_id), favorites.c.user_id))
+        for user_id, count, rating_sum, rating_count in fav_rows:
+            totals[user_id].update(favorite_count=count, rating_sum=rating_sum,
+                                   rating_count=rating_count)
+        watch_rows = db.session.execute(only(
+            db.select(watchlist.c.user_id, db.func.count())
+            .group_by(watchlist.c.user_id), watchlist.c.user_id))
+        for user_id, count in watch_rows:
+            totals[user_id]['watchlist_count'] = count
+
+        genre_rows = db.session.execute(only(
+            db.select(favorites.c.user_id, Movie.genre, db.func.count())
+            .join(Movie, Movie.id == favorites.c.movie_id)
+            .where(Movie.genre.isnot(None), Movie.genre != '')
+            .group_by(favorites.c.user_id, Movie.genre), favorites.c.user_id)).all()
+
+        if totals:
+            db.session.execute(insert(UserStats), [
+                dict(user_id=user_id, **values) for user_id, values in totals.items()
+            ])
+        if genre_rows:
+            db.session.execute(insert(UserGenreStats), [
+                dict(user_id=user_id, genre=genre, favorite_count=count)
+                for user_id, genre, count in genre_rows
+            ])
+        return len(totals)
+
+
+class UserGenreStats(db.Model):
+    """How many of one user's favorites are in each genre"""
+    __tablename__ = 'user_genre_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    genre = db.Column(db.String(50), primary_key=True)
+    favorite_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+
+# ============================================================================
+# CATALOG VERSION (read by cache.py)
+# ============================================================================
+
+class CatalogState(db.Model):
+    """Single row (id=1) counting catalog writes, shared by every worker"""
+    __tablename__ = 'catalog_state'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    modified_at = db.Column(db.DateTime(timezone=True))
+
+
+# ============================================================================
+# TRENDING SCORES (materialized by trending.py)
+# ============================================================================
+
+class TrendingScore(db.Model):
+    """Time-decayed popularity of a movie, as of TrendingState.refreshed_at"""
+    __tablename__ = 'trending_score'
+    __table_args__ = (
+        db.Index('ix_trending_score_score', 'score'),
+    )
+
+    movie_id = db.Column(db.Integer, db.ForeignKey('movie.id'), primary_key=True)
+    score = db.Column(db.Float, nullable=False)
+
+    movie = db.relationship('Movie')
+
+
+class TrendingState(db.Model):
+    """Single row (id=1) recording when trending_score was last refreshed"""
+    __tablename__ = 'trending_state'
+
+    id = db.Column(db.Integer, primary_key=True)
+    refreshed_at = db.Column(db.DateTime(timezone=True))
+
+
+class TrendingCredit(db.Model):
+    """A (user, movie) add already counted towards trending_score.
+
+    Un-favoriting and re-favoriting writes a fresh created_at; this row
+    keeps the second add from scoring again until credited_at ages out.
+    """
+    __tablename__ = 'trending_credit'
+    __table_args__ = (
+        db.Index('ix_trending_credit_credited_at', 'credited_at'),
+    )
+
+    source = db.Column(db.String(20), primary_key=True)  # 'favorites' / 'watchlist'
+    user_id = db.Column(db.Integer, primary_key=True)
+    movie_id = db.Column(db.Integer, primary_key=True)
+    credited_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+
+# ============================================================================
+# CSV IMPORT JOBS (run by importer.py)
+# ============================================================================
+
+class ImportJob(db.Model):
+    """A CSV upload being imported in the background"""
+    __tablename__ = 'import_job'
+
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False)
+    path = db.Column(db.String(500), nullable=False)  # spooled upload on disk
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued/running/done/failed
+    mode = db.Column(db.String(10), nullable=False, default='insert',
+                     server_default='insert')  # insert/upsert, see importer.IMPORT_MODES
+    imported = db.Column(db.Integer, nullable=False, default=0)
+    skipped = db.Column(db.Integer, nullable=False, default=0)
+    unchanged = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rows_per_second = db.Column(db.Float, nullable=False, default=0.0)
+    error = db.Column(db.Text)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
     created_at = db.Column(
         db.DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc)
     )
+    started_at = db.Column(db.DateTime(timezone=True))  # first run, kept on resume
+    heartbeat_at = db.Column(db.DateTime(timezone=True))  # last progress write
+    finished_at = db.Column(db.DateTime(timezone=True))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'mode': self.mode,
+            'rows_processed': self.imported + self.unchanged + self.skipped,
+            'imported': self.imported,
+            'unchanged': self.unchanged,
+            'skipped': self.skipped,
+            'rows_per_second': round(self.rows_per_second, 1),
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
 
     def __repr__(self):
-        return f"<Movie: {self.title} ({self.year})>"
\ No newline at end of file
+        return f'<ImportJob {self.id} {self.status}>'
+
+
+# ============================================================================
+# FULL-TEXT SEARCH INDEX: movie_fts (SQLite FTS5)
+# ============================================================================
+# An external-content FTS5 table over title, director and description.
+# It stores only the inverted index; the text itself stays in `movie`.
+# Triggers keep it in sync with every INSERT/UPDATE/DELETE on `movie`,
+# including raw SQL and bulk inserts that bypass the ORM.
+
+MOVIE_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS movie_fts USING fts5(
+        title, director, description,
+        content='movie', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movie_fts_ai AFTER INSERT ON movie BEGIN
+        INSERT INTO movie_fts(rowid, title, director, description)
+        VALUES (new.id, new.title, new.director, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movie_fts_ad AFTER DELETE ON movie BEGIN
+        INSERT INTO movie_fts(movie_fts, rowid, title, director, description)
+        VALUES ('delete', old.id, old.title, old.director, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movie_fts_au
+    AFTER UPDATE OF title, director, description ON movie BEGIN
+        INSERT INTO movie_fts(movie_fts, rowid, title, director, description)
+        VALUES ('delete', old.id, old.title, old.director, old.description);
+        INSERT INTO movie_fts(rowid, title, director, description)
+        VALUES (new.id, new.title, new.director, new.description);
+    END
+    """,
+]
+
+
+# ============================================================================
+# FUZZY TITLE INDEX: movie_trigram (SQLite FTS5 trigram tokenizer)
+# ============================================================================
+# Indexes every 3-character run of each title ("int", "nte", "ter", ...),
+# so titles can be found from a misspelling that shares most trigrams.
+# The fts5vocab table exposes how many titles contain each trigram, which
+# lets search.py start from the rarest ones.
+
+MOVIE_TRIGRAM_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS movie_trigram USING fts5(
+        title,
+        content='movie', content_rowid='id',
+        tokenize='trigram', detail='none'
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS movie_trigram_vocab
+    USING fts5vocab(movie_trigram, 'row')
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movie_trigram_ai AFTER INSERT ON movie BEGIN
+        INSERT INTO movie_trigram(rowid, title) VALUES (new.id, new.title);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movie_trigram_ad AFTER DELETE ON movie BEGIN
+        INSERT INTO movie_trigram(movie_trigram, rowid, title)
+        VALUES ('delete', old.id, old.title);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movie_trigram_au AFTER UPDATE OF title ON movie BEGIN
+        INSERT INTO movie_trigram(movie_trigram, rowid, title)
+        VALUES ('delete', old.id, old.title);
+        INSERT INTO movie_trigram(rowid, title) VALUES (new.id, new.title);
+    END
+    """,
+]
+
+# db.create_all() builds the search tables right after the movie table
+for _statement in MOVIE_FTS_DDL + MOVIE_TRIGRAM_DDL:
+    event.listen(
+        Movie.__table__, "after_create",
+        DDL(_statement).execute_if(dialect="sqlite")
+    )
+
+for _table in ("movie_trigram_vocab", "movie_trigram", "movie_fts"):
+    event.listen(
+        Movie.__table__, "before_drop",
+        DDL(f"DROP TABLE IF EXISTS {_table}").execute_if(dialect="sqlite")
+    )
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Hide the FTS5 tables and their shadow tables from Alembic autogenerate."""
+    if type_ == "table" and name.startswith(("movie_fts", "movie_trigram")):
+        return False
+    return True
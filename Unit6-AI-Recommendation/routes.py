@@ -2,22 +2,48 @@
 # routes.py - CineMatch Route Definitions
 # ============================================================================
 
-from flask import render_template, request, redirect, url_for, flash
+from flask import (
+    render_template, request, redirect, url_for, flash, jsonify,
+    Response, stream_with_context,
+)
 from utilities import (
-    get_csv_value,
-    parse_year,
-    parse_rating,
     search_tmdb,
     get_tmdb_movie,
     build_poster_url,
 )
-import csv
-from models import db, Movie, User
+import json
+from dataclasses import replace
+from models import db, ImportJob, Movie, User, TrendingScore, UserStats
+from catalog import (
+    KeysetPage,
+    MovieFilters,
+    api_movie_dict,
+    api_movie_query,
+    browse_cache_key,
+    get_facets,
+    keyset_chunks,
+    movie_last_modified,
+    page_arg,
+    paginate_movies,
+    parse_api_fields,
+    user_movie_flags,
+)
+from cache import bump_catalog_version, cached_page, conditional_page, get_genres
+from search import (
+    fuzzy_title_search,
+    index_movie,
+    unindex_movie,
+    title_index,
+)
+from trending import get_trending
+from importer import IMPORT_MODES, start_import_job
 from flask_login import login_user, logout_user, login_required, current_user
 from functools import wraps
 import requests, os, uuid
 from flask import current_app
 
+MAX_DASHBOARD_PAGE = 100_000  # far past any real list, far below OFFSET overflow
+
 
 def admin_required(f):
     """Decorator that requires user to be logged in AND be an admin."""
@@ -43,10 +69,42 @@ def register_routes(app):
     # ========================================================================
 
     @app.route("/")
+    @conditional_page()
+    @cached_page()
     def index():
         """Home page with featured movies"""
         movies = Movie.query.order_by(Movie.rating.desc()).limit(6).all()
-        return render_template("index.html", movies=movies)
+        return render_template(
+            "index.html", movies=movies, flags=user_movie_flags(movies)
+        )
+
+    @app.route("/popular")
+    def popular():
+        """Most favorited movies, read straight off ix_movie_popularity"""
+        limit = max(1, min(request.args.get("limit", 24, type=int), 100))
+        movies = (
+            Movie.query
+            .order_by(Movie.favorite_count.desc(),
+                      Movie.watchlist_count.desc(),
+                      Movie.id.desc())
+            .limit(limit)
+            .all()
+        )
+        return render_template(
+            "popular.html", movies=movies, flags=user_movie_flags(movies)
+        )
+
+    @app.route("/trending")
+    def trending():
+        """Trending this week, from the precomputed trending_score table"""
+        limit = max(1, min(request.args.get("limit", 24, type=int), 100))
+        movies = [movie for movie, _ in get_trending(limit)]
+        return render_template(
+            "popular.html",
+            movies=movies,
+            flags=user_movie_flags(movies),
+            trending=True,
+        )
 
     @app.route("/about")
     def about():
@@ -58,50 +116,179 @@ def register_routes(app):
     # ========================================================================
 
     @app.route("/movies")
+    @conditional_page(browse_cache_key)
+    @cached_page(browse_cache_key)
     def movies_list():
-        """Browse all movies with search, filter, and pagination"""
-        query = request.args.get("query", "").strip()
-        genre = request.args.get("genre", "").strip()
-        year = request.args.get("year", type=int)
-        min_rating = request.args.get("min_rating", type=float)
-        page = request.args.get("page", 1, type=int)
+        """Browse all movies with search, filter, and pagination
+
+        Two paging modes:
+          ?page=N                    numbered pages (OFFSET + COUNT)
+          ?paging=cursor / ?after=…  keyset pages seeking on (rating, id)
+        """
+        filters = MovieFilters.from_args(request.args)
+        page = page_arg(request.args)
+        after = request.args.get("after")
+        before = request.args.get("before")
+        use_cursor = bool(after or before or request.args.get("paging") == "cursor")
         per_page = 8
 
-        q = Movie.query
-
-        if query:
-            q = q.filter(Movie.title.ilike(f"%{query}%"))
-        if genre:
-            q = q.filter(Movie.genre == genre)
-        if year:
-            q = q.filter(Movie.year == year)
-        if min_rating:
-            q = q.filter(Movie.rating >= min_rating)
-
-        pagination = q.order_by(Movie.rating.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-
-        genres = db.session.query(Movie.genre).distinct().order_by(Movie.genre).all()
-        genres = [g[0] for g in genres if g[0]]
+        # Full-text search over title, director and description,
+        # best bm25 matches first
+        hits = filters.search_hits()
+        q = filters.apply(Movie.query, hits)
+        order_by = [Movie.rating.desc(), Movie.id.desc()]
+        if hits is not None:
+            order_by.insert(0, hits.c.rank)
+        # Several genres are read one index seek per genre; with a text
+        # search the FTS hits drive the plan instead
+        seek_genres = filters.genres if hits is None else ()
+
+        if use_cursor:
+            # Keyset mode keeps the (rating, id) order so it can seek;
+            # the text search only filters here
+            pagination = None
+            cursor_page = KeysetPage(q, per_page, after=after, before=before,
+                                     genres=seek_genres)
+            movies = cursor_page.items
+        else:
+            cursor_page = None
+            pagination = paginate_movies(q, order_by, page, per_page,
+                                         genres=seek_genres)
+            movies = pagination.items
+
+        # Nothing matched the text search: fall back to similar-looking
+        # titles (typos such as "Interstelar"), keeping the other filters
+        fuzzy = False
+        if filters.query and not movies and not (after or before or page > 1):
+            ids = fuzzy_title_search(filters.query, limit=per_page * 3)
+            if ids:
+                fuzzy = True
+                pagination = cursor_page = None
+                unfiltered = replace(filters, query="")
+                found = unfiltered.apply(Movie.query).filter(Movie.id.in_(ids)).all()
+                movies = sorted(found, key=lambda movie: ids.index(movie.id))
+
+        genres = get_genres()
+        facets = get_facets(filters)
 
         return render_template(
             "movies.html",
-            movies=pagination.items,
+            movies=movies,
+            flags=user_movie_flags(movies),
             pagination=pagination,
+            cursor_page=cursor_page,
             genres=genres,
-            query=query,
-            selected_genre=genre,
-            selected_year=year,
-            selected_min_rating=min_rating,
+            facets=facets,
+            fuzzy=fuzzy,
+            filters=filters,
+            query=filters.query,
         )
 
     @app.route("/movie/<int:id>")
+    @conditional_page(last_modified=movie_last_modified)
+    @cached_page()
     def movie_detail(id):
         """Display detailed information for a single movie"""
         movie = Movie.query.get_or_404(id)
         return render_template("movie_detail.html", movie=movie)
 
+    # ========================================================================
+    # MOVIE API (JSON)
+    # ========================================================================
+
+    @app.route("/api/movies/suggest")
+    def suggest_movies():
+        """Title autocomplete for the search box, served from memory"""
+        q = request.args.get("q", "").strip()
+        limit = max(1, min(request.args.get("limit", 8, type=int), 20))
+        return jsonify(title_index.suggest(q, limit))
+
+    @app.route("/api/movies")
+    def api_movies():
+        """Catalog as JSON, with the same filters as /movies
+
+        ?fields=id,title,rating   only these columns (default: all)
+        ?limit=N&after=…          keyset pages of JSON (default)
+        ?format=ndjson            every matching movie, one JSON object
+                                  per line, streamed in keyset chunks
+        """
+        filters = MovieFilters.from_args(request.args)
+        try:
+            fields = parse_api_fields(request.args.get("fields", ""))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        q = api_movie_query(filters, fields)
+
+        genres = () if filters.query else filters.genres
+        if request.args.get("format") == "ndjson":
+            rows = keyset_chunks(q, 1000, genres=genres)
+
+            def generate():
+                for row in rows:
+                    yield json.dumps(api_movie_dict(row, fields)) + "\n"
+
+            return Response(
+                stream_with_context(generate()),
+                mimetype="application/x-ndjson",
+            )
+
+        limit = max(1, min(request.args.get("limit", 50, type=int), 500))
+        page = KeysetPage(
+            q, limit,
+            after=request.args.get("after"),
+            before=request.args.get("before"),
+            genres=genres,
+        )
+        return jsonify({
+            "movies": [api_movie_dict(row, fields) for row in page.items],
+            "next": page.next_cursor,
+            "prev": page.prev_cursor,
+        })
+
+    @app.route("/api/movies/<int:id>/favorite", methods=["POST"])
+    @login_required
+    def api_favorite(id):
+        """Set or flip the favorite flag; JSON body {"active": true|false|null}"""
+        return _toggle_json(id, current_user.has_favorite,
+                            current_user.add_favorite, current_user.remove_favorite)
+
+    @app.route("/api/movies/<int:id>/watchlist", methods=["POST"])
+    @login_required
+    def api_watchlist(id):
+        """Set or flip the watchlist flag; JSON body {"active": true|false|null}"""
+        return _toggle_json(id, current_user.has_in_watchlist,
+                            current_user.add_to_watchlist,
+                            current_user.remove_from_watchlist)
+
+    def _toggle_json(id, is_active, add, remove):
+        # One write plus one counter read: no redirect, no page render.
+        # "active" must be a JSON boolean, or null / absent to flip: a
+        # string "false" or 0.0001 would otherwise pick a side by truthiness
+        body = request.get_json(silent=True) if request.get_data() else {}
+        if not isinstance(body, dict) or not isinstance(body.get("active"), (bool, type(None))):
+            return jsonify({"error": '"active" must be true, false or null'}), 400
+        active = body.get("active")
+        if active is None:
+            active = not is_active(id)
+        changed = add(id) if active else remove(id)
+
+        counts = db.session.execute(
+            db.select(Movie.favorite_count, Movie.watchlist_count)
+            .where(Movie.id == id)
+        ).first()
+        if counts is None:
+            db.session.rollback()
+            return jsonify({"error": "Movie not found"}), 404
+        if changed:
+            db.session.commit()
+
+        return jsonify({
+            "id": id,
+            "active": bool(active),
+            "favorite_count": counts.favorite_count,
+            "watchlist_count": counts.watchlist_count,
+        })
+
     # ========================================================================
     # MOVIE CRUD (Admin Only)
     # ========================================================================
@@ -116,9 +303,15 @@ def register_routes(app):
                 flash("Title is required!", "error")
                 return redirect(url_for("add_movie"))
 
+            year = request.form.get("year", type=int)
+            existing = Movie.find_by_natural_key(title, year)
+            if existing:
+                flash(f'"{existing.title}" ({year}) is already in the catalog!', "warning")
+                return redirect(url_for("movie_detail", id=existing.id))
+
             movie = Movie(
                 title=title,
-                year=request.form.get("year", type=int),
+                year=year,
                 genre=request.form.get("genre"),
                 director=request.form.get("director"),
                 rating=request.form.get("rating", type=float),
@@ -128,6 +321,8 @@ def register_routes(app):
             )
             db.session.add(movie)
             db.session.commit()
+            bump_catalog_version()
+            index_movie(movie)
             flash(f'✓ Movie "{movie.title}" added successfully!', "success")
             return redirect(url_for("movies_list"))
 
@@ -140,8 +335,16 @@ def register_routes(app):
         movie = Movie.query.get_or_404(id)
 
         if request.method == "POST":
-            movie.title = request.form.get("title")
-            movie.year = request.form.get("year", type=int)
+            title = request.form.get("title")
+            year = request.form.get("year", type=int)
+            existing = Movie.find_by_natural_key(title, year)
+            if existing and existing.id != movie.id:
+                flash(f'"{existing.title}" ({year}) is already in the catalog!', "error")
+                return redirect(url_for("edit_movie", id=movie.id))
+
+            old_stats_key = (movie.rating, movie.genre)
+            movie.title = title
+            movie.year = year
             movie.genre = request.form.get("genre")
             movie.director = request.form.get("director")
             movie.rating = request.form.get("rating", type=float)
@@ -151,7 +354,14 @@ def register_routes(app):
                 or f"https://placehold.co/300x450/gray/white?text={movie.title.replace(' ', '+')}"
             )
 
+            # Fans' running averages / genre tallies include this movie
+            if (movie.rating, movie.genre) != old_stats_key:
+                db.session.flush()
+                UserStats.rebuild(UserStats.users_of(movie.id))
+
             db.session.commit()
+            bump_catalog_version()
+            index_movie(movie)
             flash(f'✓ Movie "{movie.title}" updated successfully!', "success")
             return redirect(url_for("movies_list"))
 
@@ -163,8 +373,14 @@ def register_routes(app):
         """Delete a movie from the database"""
         movie = Movie.query.get_or_404(id)
         title = movie.title
+        TrendingScore.query.filter_by(movie_id=id).delete()
+        fans = UserStats.users_of(id)
         db.session.delete(movie)
+        db.session.flush()
+        UserStats.rebuild(fans)
         db.session.commit()
+        bump_catalog_version()
+        unindex_movie(id)
         flash(f'🗑 Movie "{title}" was deleted.', "success")
         return redirect(url_for("movies_list"))
 
@@ -178,59 +394,30 @@ def register_routes(app):
                 flash("Please upload a valid .csv file", "error")
                 return redirect(url_for("import_csv"))
 
-            try:
-                content = file.read().decode("utf-8", errors="replace")
-                lines = content.splitlines()
-                reader = csv.DictReader(lines)
-
-                imported = 0
-                skipped = 0
-
-                for row in reader:
-                    title = get_csv_value(
-                        row, "Series_Title", "Title", "movie_title", "name", "title"
-                    )
-                    if not title:
-                        skipped += 1
-                        continue
-
-                    movie = Movie(
-                        title=title,
-                        year=parse_year(
-                            get_csv_value(row, "Released_Year", "year", "Year")
-                        ),
-                        genre=get_csv_value(row, "Genre", "genre", "genres"),
-                        director=get_csv_value(
-                            row, "Director", "director", "directed_by"
-                        ),
-                        rating=parse_rating(
-                            get_csv_value(
-                                row, "IMDB_Rating", "rating", "imdb_rating", "Rating"
-                            )
-                        ),
-                        description=get_csv_value(
-                            row, "Overview", "description", "plot", "Plot", "Summary"
-                        ),
-                        poster_url=get_csv_value(
-                            row, "Poster_Link", "poster_url", "Poster"
-                        )
-                        or f"https://placehold.co/300x450/gray/white?text={title.replace(' ', '+')}",
-                    )
-                    db.session.add(movie)
-                    imported += 1
-
-                db.session.commit()
-                flash(f"Successfully imported {imported} movies!", "success")
-                if skipped:
-                    flash(f"Skipped {skipped} entries (missing title)", "warning")
-                return redirect(url_for("movies_list"))
-
-            except Exception as e:
-                db.session.rollback()
-                flash(f"Import failed: {str(e)}", "error")
+            mode = request.form.get("mode", "insert")
+            if mode not in IMPORT_MODES:
+                flash("Unknown import mode", "error")
                 return redirect(url_for("import_csv"))
 
-        return render_template("import_csv.html")
+            # Spool to disk and hand off to the import worker; the
+            # page polls /import_jobs/<id> for progress
+            job = start_import_job(app, file, user_id=current_user.id, mode=mode)
+            flash(f'Import of "{job.filename}" started.', "info")
+            return redirect(url_for("import_csv", job=job.id))
+
+        job_id = request.args.get("job", type=int)
+        job = db.session.get(ImportJob, job_id) if job_id else None
+        recent_jobs = ImportJob.query.order_by(ImportJob.id.desc()).limit(5).all()
+        return render_template("import_csv.html", job=job, recent_jobs=recent_jobs)
+
+    @app.route("/import_jobs/<int:id>")
+    @admin_required
+    def import_job_status(id):
+        """Progress of a background CSV import, as JSON"""
+        job = db.session.get(ImportJob, id)
+        if job is None:
+            return jsonify({"error": "Import job not found"}), 404
+        return jsonify(job.to_dict())
 
     # ========================================================================
     # AUTHENTICATION
@@ -353,9 +540,18 @@ def register_routes(app):
         genre = None
         if data.get("genres") and len(data["genres"]) > 0:
             genre = data["genres"][0]["name"]
+        # Same title + year already imported from a CSV: link it to TMDB
+        title = data.get("title", "unknown")
+        existing = Movie.find_by_natural_key(title, year)
+        if existing:
+            if existing.tmdb_id is None:
+                existing.tmdb_id = tmdb_id
+                db.session.commit()
+            flash(f'"{existing.title}" is already in the database!', "warning")
+            return redirect(url_for("search_tmdb_page"))
         # create a Movie object and save it to database
         movie = Movie(
-            title=data.get("title", "unknown"),
+            title=title,
             year=year,
             genre=genre,
             rating=round(data.get("vote_average", 0), 1),
@@ -365,6 +561,8 @@ def register_routes(app):
         )
         db.session.add(movie)
         db.session.commit()
+        bump_catalog_version()
+        index_movie(movie)
         flash(f" Imported {movie.title} from TMDB", "success")
         return redirect(url_for("search_tmdb_page"))
 
@@ -373,8 +571,7 @@ def register_routes(app):
     def favorite(id):
         # Add a movie to the user's favorites
         movie = Movie.query.get_or_404(id)
-        if movie not in current_user.favorite_movies:
-            current_user.favorite_movies.append(movie)
+        if current_user.add_favorite(movie):
             db.session.commit()
             flash(f'💖 Added "{movie.title}" to favorites!', "success")
         return redirect(url_for("movie_detail", id=id))
@@ -384,8 +581,7 @@ def register_routes(app):
     def unfavorite(id):
         # Remove a movie from the user's favorites
         movie = Movie.query.get_or_404(id)
-        if movie in current_user.favorite_movies:
-            current_user.favorite_movies.remove(movie)
+        if current_user.remove_favorite(movie):
             db.session.commit()
             flash(f'❌ Removed "{movie.title}" from favorites!', "info")
         return redirect(url_for("movie_detail", id=id))
@@ -400,8 +596,7 @@ def register_routes(app):
         """Add a movie to the user's watchlist"""
         movie = Movie.query.get_or_404(id)
 
-        if movie not in current_user.watchlist_movies:
-            current_user.watchlist_movies.append(movie)
+        if current_user.add_to_watchlist(movie):
             db.session.commit()
             flash(f'📋 Added "{movie.title}" to watchlist!', "success")
 
@@ -413,8 +608,7 @@ def register_routes(app):
         """Remove a movie from the user's watchlist"""
         movie = Movie.query.get_or_404(id)
 
-        if movie in current_user.watchlist_movies:
-            current_user.watchlist_movies.remove(movie)
+        if current_user.remove_from_watchlist(movie):
             db.session.commit()
             flash(f'Removed "{movie.title}" from watchlist.', "info")
 
@@ -427,20 +621,18 @@ def register_routes(app):
     @login_required
     def dashboard():
         user = current_user
-        favs = user.favorite_movies
-        watch = user.watchlist_movies
-
-        # Stats
-        fav_count = len(favs)
-        watch_count = len(watch)
 
-        # Average rating of favorites(only movies that have rating)
-        rated_favs = [movie.rating for movie in favs if movie.rating]
-        avg_rating = round(sum(rated_favs) / len(rated_favs), 1) if rated_favs else 0
+        # One page of each list, so the response size does not grow
+        # with the user's collection. Capped so a huge ?fav_page= is just
+        # an empty page, not an OFFSET too big for a SQLite INTEGER
+        fav_page = min(max(request.args.get("fav_page", 1, type=int), 1), MAX_DASHBOARD_PAGE)
+        watch_page = min(max(request.args.get("watch_page", 1, type=int), 1), MAX_DASHBOARD_PAGE)
+        favs, favs_has_next = user.favorites_page(fav_page)
+        watch, watch_has_next = user.watchlist_page(watch_page)
 
-        # Top Genre from favorites
-        genres = [movie.genre for movie in favs if movie.genre]
-        top_genre = max(set(genres), key=genres.count) if genres else None
+        # Stats: COUNT / AVG / GROUP BY genre in SQL
+        stats = user.dashboard_stats()
+        top_genres = stats["top_genres"]
 
         
         from flask import session #Get AI recommendations from session(if any)
@@ -450,10 +642,15 @@ def register_routes(app):
             user=user,
             favs=favs,
             watch=watch,
-            fav_count=fav_count,
-            watch_count=watch_count,
-            avg_rating=avg_rating,
-            top_genre=top_genre,
+            fav_page=fav_page,
+            watch_page=watch_page,
+            favs_has_next=favs_has_next,
+            watch_has_next=watch_has_next,
+            fav_count=stats["fav_count"],
+            watch_count=stats["watch_count"],
+            avg_rating=stats["avg_rating"],
+            top_genre=top_genres[0][0] if top_genres else None,
+            top_genres=top_genres,
             ai_recs=ai_recs  # pass AI text to template
         )
 
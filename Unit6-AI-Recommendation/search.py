@@ -0,0 +1,433 @@
+# ============================================================================
+# search.py - CineMatch Movie Search Helpers
+# ============================================================================
+
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+from flask import current_app
+from sqlalchemy import column, func, literal_column, select, table, union_all
+from cache import catalog_version
+from models import db, Movie, normalize_title
+
+
+# ============================================================================
+# FULL-TEXT SEARCH (SQLite FTS5)
+# ============================================================================
+
+# Lightweight handle on the FTS5 table created in models.py. It is not part
+# of db.metadata, so create_all() and Alembic never treat it as a normal table.
+movie_fts = table(
+    "movie_fts",
+    column("rowid"),
+    column("title"),
+    column("director"),
+    column("description"),
+)
+
+# bm25() column weights: a hit in the title counts more than one in the plot
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+
+
+def build_match_query(text):
+    """Turn free text from the search box into a safe FTS5 MATCH expression.
+
+    Every word is quoted (so FTS5 operators typed by users are ignored) and
+    prefix-matched, so "dark kni" finds "The Dark Knight".
+
+    Returns:
+        MATCH expression string, or None if the text has no searchable words
+    """
+    terms = re.findall(r"\w+", text.lower())
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def fts_search_subquery(match):
+    """Subquery of (movie_id, rank) for movies matching an FTS5 expression.
+
+    Lower rank is better (bm25 returns negative scores for good matches).
+    """
+    fts = literal_column("movie_fts")
+    return (
+        select(
+            movie_fts.c.rowid.label("movie_id"),
+            func.bm25(fts, *FTS_WEIGHTS).label("rank"),
+        )
+        .select_from(movie_fts)
+        .where(fts.op("MATCH")(match))
+        .subquery("fts_hits")
+    )
+
+
+# ============================================================================
+# FUZZY TITLE SEARCH (trigram index)
+# ============================================================================
+# "Interstelar" shares 8 of its 9 trigrams with "Interstellar". A title is a
+# fuzzy match when it contains at least FUZZY_MIN_SCORE of the query's
+# trigrams. If a title must share `needed` of the query's trigrams, it has
+# to contain at least one of the (len - needed + 1) rarest ones, so only
+# those posting lists are read. SQLite counts how many of them each title
+# contains (UNION ALL of the lists, GROUP BY rowid) and only the
+# FUZZY_MAX_CANDIDATES titles sharing the most are scored exactly, so the
+# cap drops the weakest candidates rather than arbitrary ones.
+# No edit distance is computed against the whole catalog.
+
+movie_trigram = table("movie_trigram", column("rowid"), column("title"))
+movie_trigram_vocab = table("movie_trigram_vocab", column("term"), column("doc"))
+
+FUZZY_MIN_SCORE = 0.5
+FUZZY_MAX_CANDIDATES = 2000
+
+
+def title_trigrams(text):
+    """Set of 3-character runs in a title, matching SQLite's trigram tokenizer."""
+    text = " ".join((text or "").split()).lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def fuzzy_title_search(text, limit=24, min_score=FUZZY_MIN_SCORE):
+    """Ids of titles that look like a misspelling of `text`, best first.
+
+    Ranked by the share of the query's trigrams found in the title, then by
+    overall trigram similarity (so closer-length titles win), then rating.
+    """
+    grams = title_trigrams(text)
+    if not grams:
+        return []
+    needed = math.ceil(min_score * len(grams))
+
+    doc_counts = dict(db.session.execute(
+        select(movie_trigram_vocab.c.term, movie_trigram_vocab.c.doc)
+        .where(movie_trigram_vocab.c.term.in_(grams))
+    ).all())
+    present = sorted(doc_counts, key=doc_counts.get)
+    if len(present) < needed:
+        return []
+
+    rarest = present[:len(present) - needed + 1]
+    postings = union_all(*(
+        select(movie_trigram.c.rowid)
+        .where(literal_column("movie_trigram").op("MATCH")('"' + gram.replace('"', '""') + '"'))
+        for gram in rarest
+    )).subquery("postings")
+    shared = func.count().label("shared")
+    best = (
+        select(postings.c.rowid, shared)
+        .group_by(postings.c.rowid)
+        .order_by(shared.desc())
+        .limit(FUZZY_MAX_CANDIDATES)
+        .subquery("best")
+    )
+    candidates = db.session.execute(
+        select(Movie.id, Movie.title, Movie.rating)
+        .join(best, best.c.rowid == Movie.id)
+    ).all()
+
+    scored = []
+    for movie_id, title, rating in candidates:
+        title_grams = title_trigrams(title)
+        shared = len(grams & title_grams)
+        if shared >= needed:
+            similarity = shared / len(grams | title_grams)
+            scored.append((shared / len(grams), similarity, rating or 0, movie_id))
+    scored.sort(reverse=True)
+    return [movie_id for *_, movie_id in scored[:limit]]
+
+
+# ============================================================================
+# TITLE AUTOCOMPLETE (in-memory prefix index)
+# ============================================================================
+# A sorted array of (key, movie_id) pairs searched with bisect. Each title
+# is stored once per word, so "kni" finds "The Dark Knight" as well as
+# "Knives Out". Once the index is built, suggestions never touch SQLite,
+# apart from the staleness check below (at most once a second).
+#
+# Ranking a prefix by scanning its key range costs O(matches): ~100 ms for
+# "m" on 200k titles. So every prefix matching TOP_MIN_RANGE keys or more
+# also keeps its best TOP_K movies, precomputed when the index is built and
+# patched on writes. A lookup then either reads that list or ranks a range
+# shorter than TOP_MIN_RANGE, whatever the prefix.
+#
+# Each worker process holds its own index, and add() / remove() only see
+# that process's writes. The index records the catalog_version() it
+# reflects; when suggest() finds the shared version has moved past it (a
+# write made through another worker), it rebuilds in the background and
+# keeps serving the old index meanwhile. suggest() reads the version at
+# most every VERSION_CHECK_INTERVAL seconds, so another worker's write
+# shows up within about a second without a SQLite read per keystroke.
+
+LAST_CHAR = "\U0010ffff"  # sorts after any character in a key
+
+
+class TitlePrefixIndex:
+    """Prefix index over movie titles, ranked by rating.
+
+    build() loads it from the database (at startup, and again after bulk
+    imports, or once another process has changed the catalog); add() /
+    remove() keep it up to date as movies are written.
+    """
+
+    MAX_WORDS = 6         # index the title from each of its first few words
+    TOP_K = 20            # longest suggestion list served
+    TOP_MIN_RANGE = 256   # prefixes matching this many keys keep a top list
+    VERSION_CHECK_INTERVAL = 1.0  # seconds between catalog_version() reads
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self._keys = None      # sorted [(key, movie_id)]
+        self._movies = {}      # movie_id -> (title, year, rating, keys)
+        self._top = {}         # prefix -> best TOP_K movie ids, best first
+        self._pending = None   # writes made while build() runs
+        self.version = None    # catalog_version() the index reflects
+        self._checked_at = 0.0  # time.monotonic() of the last version check
+
+    def _entries(self, title):
+        words = normalize_title(title).split(" ")
+        return [" ".join(words[i:]) for i in range(min(len(words), self.MAX_WORDS))
+                if words[i]]
+
+    @staticmethod
+    def _rank(movies, movie_id):
+        return (movies[movie_id][2] or 0, -movie_id)
+
+    def _rank_range(self, keys, movies, lo, hi, limit):
+        ids = {movie_id for _, movie_id in keys[lo:hi]}
+        return heapq.nlargest(limit, ids, key=lambda m: self._rank(movies, m))
+
+    def _collect(self, keys, movies, top, prefix, lo, hi, reuse=False):
+        """Best TOP_K ids among keys[lo:hi], which all start with `prefix`.
+
+        Stores the list in `top` for every prefix with TOP_MIN_RANGE keys or
+        more, recursing one character at a time. With `reuse`, lists already
+        in `top` stand in for their subtree.
+        """
+        if hi - lo < self.TOP_MIN_RANGE:
+            return self._rank_range(keys, movies, lo, hi, self.TOP_K)
+
+        depth = len(prefix)
+        ids = set()
+        i = lo
+        while i < hi and len(keys[i][0]) == depth:  # keys equal to the prefix
+            ids.add(keys[i][1])
+            i += 1
+        while i < hi:
+            child = keys[i][0][:depth + 1]
+            j = bisect.bisect_left(keys, (child + LAST_CHAR,), i, hi)
+            if reuse and child in top:
+                ids.update(top[child])
+            else:
+                ids.update(self._collect(keys, movies, top, child, i, j))
+            i = j
+
+        best = heapq.nlargest(self.TOP_K, ids, key=lambda m: self._rank(movies, m))
+        if prefix:
+            top[prefix] = best
+        return best
+
+    def _range(self, prefix):
+        return (bisect.bisect_left(self._keys, (prefix,)),
+                bisect.bisect_left(self._keys, (prefix + LAST_CHAR,)))
+
+    def build(self):
+        """(Re)load the index from the database.
+
+        Lookups keep using the old index while the new one is built; writes
+        made in the meantime are replayed onto it.
+        """
+        with self._build_lock:
+            self._build()
+
+    def _build(self):
+        with self._lock:
+            self._pending = []
+        try:
+            # Read first: a write landing during the load only makes this
+            # version older than the data, costing one more rebuild
+            version = catalog_version()
+            keys, movies = [], {}
+            rows = Movie.query.with_entities(
+                Movie.id, Movie.title, Movie.year, Movie.rating
+            ).yield_per(5000)
+            for movie_id, title, year, rating in rows:
+                entries = self._entries(title)
+                movies[movie_id] = (title, year, rating, entries)
+                keys.extend((key, movie_id) for key in entries)
+            keys.sort()
+            top = {}
+            self._collect(keys, movies, top, "", 0, len(keys))
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            pending, self._pending = self._pending, None
+            self._keys, self._movies, self._top = keys, movies, top
+            self.version = version
+            for movie_id, movie, write_version in pending:
+                self._remove(movie_id)
+                if movie:
+                    self._add(movie_id, *movie)
+                self._advance(write_version)
+
+    def _rebuild_in_background(self):
+        """Start a build() in a daemon thread, unless one is already running."""
+        if not self._build_lock.acquire(blocking=False):
+            return
+        app = current_app._get_current_object()
+
+        def run():
+            try:
+                with app.app_context():
+                    self._build()
+            finally:
+                self._build_lock.release()
+
+        threading.Thread(target=run, name="title-index-build", daemon=True).start()
+
+    def _is_stale(self):
+        """True if another process changed the catalog since the index was
+        built; reads catalog_state at most every VERSION_CHECK_INTERVAL."""
+        now = time.monotonic()
+        if self.version is None or now - self._checked_at < self.VERSION_CHECK_INTERVAL:
+            return False
+        self._checked_at = now
+        return catalog_version() > self.version
+
+    def _advance(self, version):
+        # A write only brings the index up to its version if no other
+        # process wrote in between; otherwise suggest() will rebuild
+        if version is not None and self.version == version - 1:
+            self.version = version
+
+    def add(self, movie, version=None):
+        """Index a new or edited movie, written as catalog `version`."""
+        with self._lock:
+            entry = (movie.title, movie.year, movie.rating)
+            if self._pending is not None:
+                self._pending.append((movie.id, entry, version))
+            if self._keys is not None:
+                self._remove(movie.id)
+                self._add(movie.id, *entry)
+                self._advance(version)
+
+    def remove(self, movie_id, version=None):
+        """Drop a deleted movie from the index, deleted as catalog `version`."""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((movie_id, None, version))
+            if self._keys is not None:
+                self._remove(movie_id)
+                self._advance(version)
+
+    def _add(self, movie_id, title, year, rating):
+        entries = self._entries(title)
+        self._movies[movie_id] = (title, year, rating, entries)
+        for key in entries:
+            bisect.insort(self._keys, (key, movie_id))
+
+        rank = self._rank(self._movies, movie_id)
+        for prefix in {key[:n] for key in entries for n in range(1, len(key) + 1)}:
+            ids = self._top.get(prefix)
+            if ids is None:
+                # Keep every prefix of TOP_MIN_RANGE keys or more covered
+                lo, hi = self._range(prefix)
+                if hi - lo >= self.TOP_MIN_RANGE:
+                    self._top[prefix] = self._rank_range(
+                        self._keys, self._movies, lo, hi, self.TOP_K)
+                continue
+            i = 0
+            while i < len(ids) and self._rank(self._movies, ids[i]) > rank:
+                i += 1
+            if i < self.TOP_K:
+                ids.insert(i, movie_id)
+                del ids[self.TOP_K:]
+
+    def _remove(self, movie_id):
+        old = self._movies.pop(movie_id, None)
+        if not old:
+            return
+        for key in old[3]:
+            i = bisect.bisect_left(self._keys, (key, movie_id))
+            if i < len(self._keys) and self._keys[i] == (key, movie_id):
+                del self._keys[i]
+
+        # Refill the lists it was in, longest prefix first, so each one can
+        # be merged from its (already refilled) children
+        stale = {key[:n] for key in old[3] for n in range(1, len(key) + 1)}
+        for prefix in sorted(stale, key=len, reverse=True):
+            if movie_id in self._top.get(prefix, ()):
+                lo, hi = self._range(prefix)
+                if hi - lo < self.TOP_MIN_RANGE:
+                    del self._top[prefix]  # short enough to rank on lookup
+                else:
+                    self._collect(self._keys, self._movies, self._top,
+                                  prefix, lo, hi, reuse=True)
+
+    def suggest(self, text, limit=8):
+        """Best-rated titles starting with `text` (at any word boundary).
+
+        Returns:
+            List of dicts with id, title, year and rating (at most TOP_K)
+        """
+        prefix = normalize_title(text)
+        if not prefix:
+            return []
+        if self._keys is None:
+            # Normally built at startup (app.start_background_work)
+            with self._build_lock:
+                if self._keys is None:
+                    self._build()
+        elif self._is_stale():
+            self._rebuild_in_background()
+
+        with self._lock:
+            limit = min(limit, self.TOP_K)
+            ids = self._top.get(prefix)
+            if ids is None:
+                lo, hi = self._range(prefix)
+                ids = self._rank_range(self._keys, self._movies, lo, hi, limit)
+            results = []
+            for movie_id in ids[:limit]:
+                title, year, rating, _ = self._movies[movie_id]
+                results.append({"id": movie_id, "title": title,
+                                "year": year, "rating": rating})
+            return results
+
+
+title_index = TitlePrefixIndex()
+
+
+def index_movie(movie):
+    """Add or refresh a movie in the in-memory title indexes.
+
+    Call after bump_catalog_version(), so the write's version is known.
+    """
+    title_index.add(movie, catalog_version())
+
+
+def unindex_movie(movie_id):
+    """Remove a deleted movie from the in-memory title indexes."""
+    title_index.remove(movie_id, catalog_version())
+
+
+def build_title_indexes_in_background(app):
+    """Build the in-memory title indexes in a daemon thread."""
+    def run():
+        with app.app_context():
+            title_index.build()
+
+    thread = threading.Thread(target=run, name="title-index-build", daemon=True)
+    thread.start()
+    return thread
+
+
+def reset_title_indexes():
+    """Rebuild the in-memory title indexes from the database (after bulk imports)."""
+    title_index.build()
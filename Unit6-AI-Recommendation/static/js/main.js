@@ -29,6 +29,106 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
     
+    // Title autocomplete: fill the search box's <datalist> from the
+    // /api/movies/suggest endpoint as the user types
+    document.querySelectorAll('input[data-suggest-url]').forEach(input => {
+        const list = document.getElementById(input.getAttribute('list'));
+        let timer = null;
+        let lastQuery = '';
+
+        input.addEventListener('input', function () {
+            clearTimeout(timer);
+            const q = input.value.trim();
+            if (q.length < 2 || q === lastQuery) {
+                return;
+            }
+            timer = setTimeout(function () {
+                lastQuery = q;
+                const url = input.dataset.suggestUrl + '?q=' + encodeURIComponent(q);
+                fetch(url)
+                    .then(response => response.json())
+                    .then(movies => {
+                        list.innerHTML = '';
+                        movies.forEach(movie => {
+                            const option = document.createElement('option');
+                            option.value = movie.title;
+                            if (movie.year) {
+                                option.label = movie.title + ' (' + movie.year + ')';
+                            }
+                            list.appendChild(option);
+                        });
+                    })
+                    .catch(() => {});
+            }, 150);
+        });
+    });
+
+    // Favorite / watchlist buttons: flip the state with one small JSON
+    // request instead of posting the form and re-rendering the page.
+    // Without JavaScript (or if the request fails) the form still works.
+    document.querySelectorAll('form[data-toggle]').forEach(form => {
+        form.addEventListener('submit', function (e) {
+            e.preventDefault();
+            const button = form.querySelector('button');
+            const wanted = form.dataset.active !== 'true';
+            button.disabled = true;
+
+            fetch(form.dataset.apiUrl, {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({active: wanted})
+            })
+                .then(response => {
+                    const type = response.headers.get('Content-Type') || '';
+                    if (!response.ok || !type.includes('application/json')) {
+                        throw new Error('toggle failed');
+                    }
+                    return response.json();
+                })
+                .then(data => {
+                    setToggleState(form, data.active);
+                    document.querySelectorAll('[data-count]').forEach(badge => {
+                        if (badge.dataset.count in data) {
+                            badge.textContent = data[badge.dataset.count];
+                        }
+                    });
+                    button.disabled = false;
+                })
+                .catch(() => form.submit());
+        });
+    });
+
+    function setToggleState(form, active) {
+        const state = active ? 'on' : 'off';
+        form.dataset.active = active ? 'true' : 'false';
+        form.action = form.dataset[state + 'Action'];
+        form.querySelectorAll('[data-on-class]').forEach(el => {
+            el.classList.remove(el.dataset.onClass, el.dataset.offClass);
+            el.classList.add(el.dataset[state + 'Class']);
+        });
+        const label = form.querySelector('[data-label]');
+        label.textContent = label.dataset[state + 'Text'];
+    }
+
+    // CSV import progress: poll the job's JSON status until it finishes
+    document.querySelectorAll('[data-import-job-url]').forEach(card => {
+        function poll() {
+            fetch(card.dataset.importJobUrl)
+                .then(response => response.json())
+                .then(job => {
+                    card.querySelectorAll('[data-job-field]').forEach(el => {
+                        const value = job[el.dataset.jobField];
+                        el.textContent = value === null ? '' : value;
+                    });
+                    if (job.status === 'queued' || job.status === 'running') {
+                        setTimeout(poll, 1000);
+                    }
+                })
+                .catch(() => setTimeout(poll, 5000));
+        }
+        poll();
+    });
+
     // Log to console (helps students debug)
     console.log('âœ… Flash message auto-dismiss enabled');
     console.log('âœ… Smooth scrolling enabled');
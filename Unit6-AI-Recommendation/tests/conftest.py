@@ -0,0 +1,39 @@
+# ============================================================================
+# conftest.py - CineMatch Test Fixtures
+# ============================================================================
+#
+# Every test gets freshly created tables (plus the sample movies from
+# db_init) in a throwaway SQLite file, and no background threads.
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+# app.py reads DATABASE_URL when it is imported
+_db_dir = tempfile.mkdtemp(prefix="cinematch-tests-")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_db_dir, "cinematch.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as cinematch  # noqa: E402
+from cache import _page_cache  # noqa: E402
+from db_init import init_db  # noqa: E402
+from models import db  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    cinematch._background_started = True  # no trending / import / index threads
+    cinematch.app.config.update(TESTING=True)
+    _page_cache.clear()  # catalog versions restart at 0 with the new tables
+    init_db(cinematch.app)
+    yield cinematch.app
+    with cinematch.app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
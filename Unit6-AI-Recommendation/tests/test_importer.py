@@ -0,0 +1,55 @@
+import pytest
+
+import importer
+from models import db, ImportJob
+
+
+class _Crash(BaseException):
+    """Stands in for the process dying: import_movies() does not catch it."""
+
+
+def _write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        f.write("Title,Year,Genre,Rating\n")
+        for i in range(rows):
+            f.write(f"Resumed Movie {i},{1950 + i % 70},Drama,7.{i % 10}\n")
+
+
+def test_resumed_job_counts_each_row_once(app, tmp_path, monkeypatch):
+    path = tmp_path / "movies.csv"
+    _write_csv(path, 100)
+    # The crashed run must leave its spooled file behind, as a dead process would
+    monkeypatch.setattr(importer.os, "remove", lambda path: None)
+
+    commit_batch, batches = importer._commit_batch, []
+
+    def crash_after_two_batches(*args):
+        commit_batch(*args)
+        batches.append(args)
+        if len(batches) == 2:
+            raise _Crash
+
+    with app.app_context():
+        job = ImportJob(filename="movies.csv", path=str(path), mode="upsert")
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+
+        monkeypatch.setattr(importer, "_commit_batch", crash_after_two_batches)
+        with pytest.raises(_Crash):
+            importer.run_import_job(job_id, batch_size=20)
+        monkeypatch.setattr(importer, "_commit_batch", commit_batch)
+
+        db.session.rollback()
+        job = db.session.get(ImportJob, job_id)
+        assert (job.status, job.imported) == ("running", 40)
+
+        # What the resume sweep does once the job's lease has run out
+        job.status = "queued"
+        db.session.commit()
+        importer.run_import_job(job_id, batch_size=20)
+
+        job = db.session.get(ImportJob, job_id)
+        assert job.status == "done"
+        assert (job.imported, job.unchanged, job.skipped) == (100, 0, 0)
+        assert job.to_dict()["rows_processed"] == 100
@@ -0,0 +1,22 @@
+import pytest
+
+TOO_BIG = "99999999999999999999"  # past SQLite's 64-bit INTEGER
+
+
+@pytest.mark.parametrize("url", [
+    f"/movies?year={TOO_BIG}",
+    f"/movies?year_min={TOO_BIG}",
+    f"/movies?year_min=-{TOO_BIG}&year_max={TOO_BIG}",
+    f"/movies?page={TOO_BIG}",
+    f"/movies?page=-{TOO_BIG}",
+    f"/api/movies?year_max={TOO_BIG}",
+    f"/api/movies?year_min={TOO_BIG}&format=ndjson",
+])
+def test_out_of_range_numbers_are_not_server_errors(client, url):
+    assert client.get(url).status_code in (200, 400)
+
+
+def test_out_of_range_years_are_clamped(client):
+    everything = client.get(f"/api/movies?year_min=-{TOO_BIG}").get_json()["movies"]
+    assert everything
+    assert client.get(f"/api/movies?year_min={TOO_BIG}").get_json()["movies"] == []
@@ -0,0 +1,203 @@
+# ============================================================================
+# trending.py - CineMatch "Trending This Week" Ranking
+# ============================================================================
+#
+# Every favorite / watchlist add is an event worth EVENT_WEIGHTS points that
+# halves every HALF_LIFE. Rather than summing that over all events on each
+# page view, refresh_trending() runs periodically and:
+#
+#   1. decays every stored score by the time since the last refresh
+#      (one UPDATE; the factor is the same for every row), and
+#   2. adds only the events created since then, read off the created_at
+#      indexes on the association tables.
+#
+# The /trending page is then one indexed read of trending_score.
+#
+# Removing a favorite does not take its points back; the event still
+# happened, and its weight fades like any other. Adding it again does not
+# earn new points either: trending_credit remembers each (user, movie)
+# already counted for CREDIT_WINDOW.
+#
+# Each refresh claims its (last, now] window with a conditional UPDATE of
+# trending_state before folding anything, so the per-worker threads and a
+# cron `flask refresh-trending` can overlap without double counting.
+
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+import click
+from sqlalchemy.dialects.sqlite import insert
+from models import db, favorites, watchlist, Movie, TrendingCredit, TrendingScore, TrendingState
+
+log = logging.getLogger(__name__)
+
+HALF_LIFE = timedelta(days=3)
+EVENT_WEIGHTS = ((favorites, 1.0), (watchlist, 0.5))
+MIN_SCORE = 0.01                # scores decayed below this are dropped
+REFRESH_INTERVAL = 10 * 60      # seconds between background refreshes
+UPSERT_BATCH = 500              # rows per multi-VALUES upsert
+
+# On the very first refresh, only look this far back
+FIRST_RUN_WINDOW = 4 * HALF_LIFE
+
+# A (user, movie) add scores again only once its last credit is this old
+CREDIT_WINDOW = 4 * HALF_LIFE
+
+
+def _as_utc(value):
+    """SQLite hands datetimes back without a timezone; they are stored as UTC."""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _decay(age):
+    return 0.5 ** (age / HALF_LIFE)
+
+
+# ============================================================================
+# REFRESH JOB
+# ============================================================================
+
+def _claim_window(now):
+    """Move trending_state.refreshed_at to `now`, if nobody else moves it first.
+
+    The conditional UPDATE is also the first write of the transaction, so
+    SQLite takes its write lock here: a second refresh that read the same
+    refreshed_at blocks until this one commits, then matches no row.
+
+    Returns:
+        (claimed, previous refreshed_at or None)
+    """
+    row = db.session.execute(
+        db.select(TrendingState.refreshed_at).where(TrendingState.id == 1)
+    ).first()
+    if row is None:
+        result = db.session.execute(
+            insert(TrendingState.__table__)
+            .values(id=1, refreshed_at=now)
+            .on_conflict_do_nothing(index_elements=["id"])
+        )
+        return result.rowcount == 1, None
+
+    last = row.refreshed_at
+    column = TrendingState.__table__.c.refreshed_at
+    result = db.session.execute(
+        db.update(TrendingState.__table__)
+        .where(TrendingState.__table__.c.id == 1,
+               column.is_(None) if last is None else column == last)
+        .values(refreshed_at=now)
+    )
+    return result.rowcount == 1, last
+
+
+def _credit_new_events(table, since, now):
+    """Events in (since, now] whose (user, movie) has no live credit yet.
+
+    Records a credit for each one, so a user toggling a movie off and on
+    again scores it at most once per CREDIT_WINDOW.
+    """
+    rows = db.session.execute(
+        db.select(table.c.user_id, table.c.movie_id, table.c.created_at)
+        .where(table.c.created_at > since, table.c.created_at <= now)
+    ).all()
+    credited = []
+    for start in range(0, len(rows), UPSERT_BATCH):
+        stmt = insert(TrendingCredit.__table__).values([
+            {"source": table.name, "user_id": user_id,
+             "movie_id": movie_id, "credited_at": created_at}
+            for user_id, movie_id, created_at in rows[start:start + UPSERT_BATCH]
+        ])
+        credited += db.session.execute(
+            stmt.on_conflict_do_nothing()
+            .returning(stmt.table.c.movie_id, stmt.table.c.credited_at)
+        ).all()
+    return credited
+
+
+def refresh_trending(now=None):
+    """Fold new favorite/watchlist events into trending_score and commit.
+
+    Safe to run from several workers and cron at once: only the refresh
+    that claims the (last, now] window folds it in; the others return 0.
+
+    Returns:
+        Number of new events folded in
+    """
+    now = now or datetime.now(timezone.utc)
+    claimed, last = _claim_window(now)
+    if not claimed:
+        db.session.rollback()
+        return 0
+    last = _as_utc(last) if last else None
+
+    if last is not None and now > last:
+        db.session.execute(
+            db.update(TrendingScore).values(score=TrendingScore.score * _decay(now - last))
+        )
+
+    db.session.execute(
+        db.delete(TrendingCredit).where(TrendingCredit.credited_at <= now - CREDIT_WINDOW)
+    )
+    since = last or now - FIRST_RUN_WINDOW
+    gained, events = Counter(), 0
+    for table, weight in EVENT_WEIGHTS:
+        for movie_id, created_at in _credit_new_events(table, since, now):
+            gained[movie_id] += weight * _decay(now - _as_utc(created_at))
+            events += 1
+
+    items = list(gained.items())
+    for start in range(0, len(items), UPSERT_BATCH):
+        stmt = insert(TrendingScore).values([
+            {"movie_id": movie_id, "score": score}
+            for movie_id, score in items[start:start + UPSERT_BATCH]
+        ])
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[TrendingScore.movie_id],
+            set_={"score": TrendingScore.score + stmt.excluded.score},
+        ))
+
+    db.session.execute(db.delete(TrendingScore).where(TrendingScore.score < MIN_SCORE))
+    db.session.commit()
+    return events
+
+
+def get_trending(limit=24):
+    """Top trending movies as (movie, score) pairs, highest score first."""
+    return (
+        db.session.query(Movie, TrendingScore.score)
+        .join(TrendingScore, TrendingScore.movie_id == Movie.id)
+        .order_by(TrendingScore.score.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+# ============================================================================
+# BACKGROUND WORKER & CLI
+# ============================================================================
+
+def start_trending_worker(app, interval=REFRESH_INTERVAL):
+    """Refresh trending scores every `interval` seconds in a daemon thread."""
+    def run():
+        while True:
+            with app.app_context():
+                try:
+                    refresh_trending()
+                except Exception:
+                    db.session.rollback()
+                    log.exception("Trending refresh failed")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name="trending-refresh", daemon=True)
+    thread.start()
+    return thread
+
+
+def register_trending(app):
+    """Add the `flask refresh-trending` command (for cron)."""
+    @app.cli.command("refresh-trending")
+    def refresh_trending_command():
+        """Fold new favorite/watchlist events into the trending ranking."""
+        events = refresh_trending()
+        click.echo(f"Folded {events} new event(s) into trending_score.")
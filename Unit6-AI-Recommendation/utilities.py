@@ -44,6 +44,57 @@ def get_csv_value(row, *keys):
     return None
 
 
+def compile_csv_extractor(fieldnames, columns):
+    """Build a row -> tuple extractor for a CSV header, resolved once per file.
+
+    The per-row equivalent of calling get_csv_value() (and a parser) for
+    every column, without probing each candidate name on every row.
+
+    Args:
+        fieldnames: the header row, e.g. reader.fieldnames or next(reader)
+        columns: sequence of (candidate_names, parse) pairs; parse is applied
+            to the stripped value (e.g. parse_year) or may be None
+
+    Returns:
+        Function taking a csv.reader row (list of strings) and returning a
+        tuple with one value per column, None where every candidate is empty.
+    """
+    # Later duplicates of a header name win, as with csv.DictReader
+    positions = {name: i for i, name in enumerate(fieldnames or ())}
+    getters = [
+        _csv_column_getter([positions[name] for name in candidates if name in positions], parse)
+        for candidates, parse in columns
+    ]
+
+    def extract(row):
+        return tuple([get(row) for get in getters])
+    return extract
+
+
+def _csv_column_getter(indexes, parse):
+    if not indexes:
+        return lambda row: None
+
+    if len(indexes) == 1:
+        # Usual case: the header matched exactly one candidate name
+        index = indexes[0]
+
+        def get(row):
+            value = row[index].strip() if index < len(row) else None
+            if not value:
+                return None
+            return parse(value) if parse else value
+        return get
+
+    def get(row):
+        for index in indexes:
+            value = row[index].strip() if index < len(row) else None
+            if value:
+                return parse(value) if parse else value
+        return None
+    return get
+
+
 # ============================================================================
 # TMDB API HELPERS (Lesson 5.1)
 # ============================================================================